@@ -14,6 +14,7 @@ from dataclasses import dataclass, field
 import configparser
 import sys
 import datetime
+import logging
 import time
 import random
 
@@ -22,13 +23,17 @@ from emulation import simclient
 from emulation import simapi
 
 import networkx
+import numpy as np
+from sgp4.api import SatrecArray, jday # type: ignore
 from skyfield.api import load, wgs84 # type: ignore
 from skyfield.api import EarthSatellite # type: ignore
-from skyfield.positionlib import Geocentric # type: ignore
+from skyfield.functions import rot_z # type: ignore
+from skyfield.sgp4lib import theta_GMST1982 # type: ignore
 from skyfield.toposlib import GeographicPosition # type: ignore
-from skyfield.units import Angle, Distance # type: ignore
 
 
+logger = logging.getLogger(__name__)
+
 
 def calculate_link_delay(distance_km: float) -> float:
     '''
@@ -55,20 +60,67 @@ def calculate_link_delay(distance_km: float) -> float:
     
     return round(total_delay, 3)  # Round to 3 decimal places  
 
+
+# WGS84 ellipsoid
+WGS84_A = 6378.137  # km
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+WGS84_EP2 = WGS84_E2 / (1 - WGS84_E2)
+
+
+def ecef_to_geodetic(xyz: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Convert ITRF (ECEF) positions to WGS84 geodetic coordinates.
+
+    Args:
+        xyz: Array of shape (N, 3) in kilometers
+
+    Returns:
+        (lat degrees, lon degrees, height km) arrays of length N
+
+    Uses Bowring's closed form, which is accurate to well under a meter
+    for points near the surface of the earth and in low earth orbit.
+    '''
+    x = xyz[:, 0]
+    y = xyz[:, 1]
+    z = xyz[:, 2]
+    p = np.hypot(x, y)
+    theta = np.arctan2(z * WGS84_A, p * WGS84_B)
+    lat = np.arctan2(z + WGS84_EP2 * WGS84_B * np.sin(theta) ** 3,
+                     p - WGS84_E2 * WGS84_A * np.cos(theta) ** 3)
+    lon = np.arctan2(y, x)
+    sin_lat = np.sin(lat)
+    height = p * np.cos(lat) + z * sin_lat - WGS84_A * np.sqrt(1 - WGS84_E2 * sin_lat ** 2)
+    return np.degrees(lat), np.degrees(lon), height
+
+
+def surface_vectors(lat_deg: np.ndarray, lon_deg: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Return the ITRF positions (km) and local up unit vectors of points on the
+    surface of the WGS84 ellipsoid.
+
+    Both arrays have the shape (len(lat_deg), 3).
+    '''
+    lat = np.radians(np.asarray(lat_deg, dtype=float))
+    lon = np.radians(np.asarray(lon_deg, dtype=float))
+    up = np.stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)), axis=-1)
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(lat) ** 2)
+    xyz = np.stack((n * up[:, 0], n * up[:, 1], n * (1 - WGS84_E2) * up[:, 2]), axis=-1)
+    return xyz, up
+
+
 @dataclass
 class Satellite:
     '''
     Represents an instance of a satellite
+
+    Positions are held by SatSimulation in arrays indexed in the
+    same order as SatSimulation.satellites.
     '''
 
     name: str
     earth_sat: EarthSatellite
-    geo: Geocentric = None
-    lat: Angle = 0
-    lon: Angle = 0
-    height: Distance = 0
-    inter_plane_status: bool = True
-    prev_inter_plane_status: bool = True
 
 @dataclass
 class Uplink:
@@ -92,68 +144,64 @@ class Waypoint:
     lat: float
     lon: float
 
-@dataclass
-class MovingStation(GroundStation):
-    '''Represents an instance of a moving station (vessel)'''
-    waypoints: list[Waypoint] = field(default_factory=list)
-    current_waypoint_index: int = 0
-    next_waypoint_index: int = 1
-    moving_forward: bool = True
-    SPEED: float = 1.0 #0.01  # degrees per update
+def advance_vessels(lat: np.ndarray, lon: np.ndarray,
+                    waypoints_lat: np.ndarray, waypoints_lon: np.ndarray,
+                    num_waypoints: np.ndarray, current_index: np.ndarray,
+                    next_index: np.ndarray, moving_forward: np.ndarray,
+                    speed: np.ndarray) -> tuple[np.ndarray, ...]:
+    '''
+    Move every vessel one step along its waypoints at constant speed.
 
-    def update_position(self) -> None:
-        """Update the vessel's position based on constant speed movement"""
-        if not self.waypoints or len(self.waypoints) < 2:
-            return
+    Vessels are rows of the arrays. waypoints_lat / waypoints_lon are padded to
+    shape (N_vessel, max waypoints) with num_waypoints giving the valid count
+    per row. Vessels with fewer than two waypoints do not move.
 
-        current_lat = float(self.position.latitude.degrees)
-        current_lon = float(self.position.longitude.degrees)
-        current_wp = self.waypoints[self.current_waypoint_index]
-        next_wp = self.waypoints[self.next_waypoint_index]
+    Returns:
+        (new_lat, new_lon, current_index, next_index, moving_forward)
+    '''
+    rows = np.arange(len(lat))
+    movable = num_waypoints >= 2
+    current_wp_lat = waypoints_lat[rows, current_index]
+    current_wp_lon = waypoints_lon[rows, current_index]
+    next_wp_lat = waypoints_lat[rows, next_index]
+    next_wp_lon = waypoints_lon[rows, next_index]
+
+    # Calculate direction vector
+    delta_lat = next_wp_lat - current_wp_lat
+    delta_lon = next_wp_lon - current_wp_lon
+
+    # Normalize direction vector
+    distance = (delta_lat ** 2 + delta_lon ** 2) ** 0.5
+    safe_distance = np.where(distance > 0, distance, 1.0)
+    move_lat = np.where(distance > 0, (delta_lat / safe_distance) * speed, 0.0)
+    move_lon = np.where(distance > 0, (delta_lon / safe_distance) * speed, 0.0)
+
+    # Update position
+    new_lat = np.where(movable, lat + move_lat, lat)
+    new_lon = np.where(movable, lon + move_lon, lon)
+
+    # Check if we've reached the next waypoint. If so the next waypoint becomes
+    # the current one, and at either end of the list the direction reverses.
+    new_distance = ((new_lat - next_wp_lat) ** 2 + (new_lon - next_wp_lon) ** 2) ** 0.5
+    reached = movable & (new_distance < speed)
+    at_end = np.where(moving_forward, next_index == num_waypoints - 1, next_index == 0)
+    moving_forward = np.where(reached & at_end, ~moving_forward, moving_forward)
+    current_index = np.where(reached, next_index, current_index)
+    next_index = np.where(reached, next_index + np.where(moving_forward, 1, -1), next_index)
+
+    return new_lat, new_lon, current_index, next_index, moving_forward
 
-        # Calculate direction vector
-        delta_lat = next_wp.lat - current_wp.lat
-        delta_lon = next_wp.lon - current_wp.lon
-        
-        # Normalize direction vector
-        distance = (delta_lat ** 2 + delta_lon ** 2) ** 0.5
-        if distance > 0:
-            move_lat = (delta_lat / distance) * self.SPEED
-            move_lon = (delta_lon / distance) * self.SPEED
-        else:
-            move_lat = move_lon = 0
-
-        # Update position
-        new_lat = current_lat + move_lat
-        new_lon = current_lon + move_lon
-
-        # Check if we've reached the next waypoint
-        new_distance = ((new_lat - next_wp.lat) ** 2 + (new_lon - next_wp.lon) ** 2) ** 0.5
-        if new_distance < self.SPEED:
-            # We've reached the waypoint, update indices
-            if self.moving_forward:
-                if self.next_waypoint_index == len(self.waypoints) - 1:
-                    # Reached last waypoint, reverse direction
-                    self.moving_forward = False
-                    self.current_waypoint_index = self.next_waypoint_index
-                    self.next_waypoint_index = self.current_waypoint_index - 1
-                else:
-                    # Move to next waypoint
-                    self.current_waypoint_index = self.next_waypoint_index
-                    self.next_waypoint_index += 1
-            else:
-                if self.next_waypoint_index == 0:
-                    # Reached first waypoint, reverse direction
-                    self.moving_forward = True
-                    self.current_waypoint_index = 0
-                    self.next_waypoint_index = 1
-                else:
-                    # Move to previous waypoint
-                    self.current_waypoint_index = self.next_waypoint_index
-                    self.next_waypoint_index -= 1
 
-        # Update the position using wgs84.latlon
-        self.position = wgs84.latlon(new_lat, new_lon)
+@dataclass
+class MovingStation(GroundStation):
+    '''
+    Represents an instance of a moving station (vessel)
+
+    Movement state is held by SatSimulation in arrays indexed in the
+    same order as SatSimulation.moving_stations.
+    '''
+    waypoints: list[Waypoint] = field(default_factory=list)
+    SPEED: float = 1.0 #0.01  # degrees per update
 
 
 class SatSimulation:
@@ -163,6 +211,8 @@ class SatSimulation:
     # Time slice for simulation
     TIME_SLICE = 10
     MIN_ELEVATION = 15
+    # Satellites further than this in latitude or longitude are not checked for uplinks
+    NEARBY_DEGREES = 20
 
 
     def __init__(self, graph: networkx.Graph):
@@ -176,6 +226,9 @@ class SatSimulation:
         self.zero_uplink_count = 0
         self.uplink_updates = 0
         self.moving_stations: list[MovingStation] = []  # Changed from self.vessels
+        # Skyfield time shared by all calculations for the current tick
+        self.sfield_time = None
+        self.sfield_datetime: datetime.datetime = None
 
         for name in torus_topo.ground_stations(graph):
             node = graph.nodes[name]
@@ -183,14 +236,28 @@ class SatSimulation:
             ground_station = GroundStation(name, position)
             self.ground_stations.append(ground_station)
 
+        epoch = torus_topo.OrbitData.current_epoch()
         for name in torus_topo.satellites(graph):
             orbit = graph.nodes[name]["orbit"]
-            ts = load.timescale()
-            l1, l2 = orbit.tle_format()
-            earth_satellite = EarthSatellite(l1, l2, name, ts)
+            l1, l2 = orbit.tle_format(epoch)
+            earth_satellite = EarthSatellite(l1, l2, name, self.ts)
             satellite = Satellite(name, earth_satellite)
             self.satellites.append(satellite)
 
+        # Propagate all satellites together with one SGP4 call per update.
+        # Positions are kept as arrays indexed in the order of self.satellites.
+        self.sat_array = SatrecArray([satellite.earth_sat.model for satellite in self.satellites])
+        self.sat_lat_deg = np.zeros(len(self.satellites))
+        self.sat_lon_deg = np.zeros(len(self.satellites))
+        self.sat_height_km = np.zeros(len(self.satellites))
+        self.sat_itrf_km = np.zeros((len(self.satellites), 3))
+        # True when a satellite is inside the latitudes where inter plane links can connect
+        self.inter_plane_status = np.ones(len(self.satellites), dtype=bool)
+        self.prev_inter_plane_status = np.ones(len(self.satellites), dtype=bool)
+        # Satellite indexes sorted by latitude, see indexSatellites
+        self.sat_lat_order = np.arange(len(self.satellites))
+        self.sat_lat_sorted = np.zeros(len(self.satellites))
+
         # Initialize vessels
         for name in torus_topo.vessels(graph):
             node = graph.nodes[name]
@@ -204,77 +271,166 @@ class SatSimulation:
             )
             self.moving_stations.append(moving_station)   
 
+        # Vessel movement state, one row per entry in self.moving_stations
+        num_vessels = len(self.moving_stations)
+        max_waypoints = max([len(station.waypoints) for station in self.moving_stations], default=0)
+        self.vessel_lat_deg = np.array([station.position.latitude.degrees for station in self.moving_stations], dtype=float)
+        self.vessel_lon_deg = np.array([station.position.longitude.degrees for station in self.moving_stations], dtype=float)
+        self.vessel_waypoints_lat = np.zeros((num_vessels, max(max_waypoints, 2)))
+        self.vessel_waypoints_lon = np.zeros((num_vessels, max(max_waypoints, 2)))
+        self.vessel_num_waypoints = np.zeros(num_vessels, dtype=int)
+        for i, station in enumerate(self.moving_stations):
+            self.vessel_num_waypoints[i] = len(station.waypoints)
+            for j, wp in enumerate(station.waypoints):
+                self.vessel_waypoints_lat[i, j] = wp.lat
+                self.vessel_waypoints_lon[i, j] = wp.lon
+        self.vessel_current_index = np.zeros(num_vessels, dtype=int)
+        self.vessel_next_index = np.ones(num_vessels, dtype=int)
+        self.vessel_moving_forward = np.ones(num_vessels, dtype=bool)
+        self.vessel_speed = np.array([station.SPEED for station in self.moving_stations], dtype=float)
+
+        # Satellite to satellite links and their current state
+        sat_names = set(satellite.name for satellite in self.satellites)
+        self.sat_link_pairs: list[tuple[str, str]] = []
+        sat_link_up = []
+        for node1, node2, up in graph.edges(data="up", default=True):
+            if node1 in sat_names and node2 in sat_names:
+                sat_link_up.append(up)
+                self.sat_link_pairs.append((node1, node2))
+        self.sat_link_up = np.array(sat_link_up, dtype=bool)
+        # Index into sat_link_pairs for both orderings of the link's nodes
+        sat_link_index: dict[tuple[str, str], int] = {}
+        for i, (node1, node2) in enumerate(self.sat_link_pairs):
+            sat_link_index[node1, node2] = i
+            sat_link_index[node2, node1] = i
+
+        # Inter ring neighbors of each satellite, in the order of self.satellites,
+        # as (neighbor name, index into sat_link_pairs)
+        self.inter_ring_neighbors: list[list[tuple[str, int]]] = [
+            [(neighbor, sat_link_index[satellite.name, neighbor])
+             for neighbor in graph.adj[satellite.name]
+             if graph.edges[satellite.name, neighbor]["inter_ring"]]
+            for satellite in self.satellites
+        ]
+
+        # Both types of stations. Membership is fixed for the life of the simulation.
+        self.all_stations: list[GroundStation] = self.ground_stations + self.moving_stations
+
+        # Location of every station, in the order of all_stations.
+        # Ground station rows are fixed, vessel rows are updated as they move.
+        self.station_lat_deg = np.concatenate((
+            [station.position.latitude.degrees for station in self.ground_stations],
+            self.vessel_lat_deg))
+        self.station_lon_deg = np.concatenate((
+            [station.position.longitude.degrees for station in self.ground_stations],
+            self.vessel_lon_deg))
+        self.station_xyz_km, self.station_up = surface_vectors(self.station_lat_deg, self.station_lon_deg)
+
+    def skyfieldTime(self, future_time: datetime.datetime):
+        '''
+        Return the skyfield Time for future_time.
+
+        The same Time instance is returned for every call made during a tick.
+        '''
+        if self.sfield_time is None or self.sfield_datetime != future_time:
+            self.sfield_time = self.ts.from_datetime(future_time)
+            self.sfield_datetime = future_time
+        return self.sfield_time
+
+    def propagateSatellites(self, future_time: datetime.datetime):
+        '''
+        Compute the position of every satellite at the given time.
+
+        All satellites are run through SGP4 in one vectorized call and the
+        resulting TEME vectors are rotated to ITRF together (polar motion ignored).
+        '''
+        sfield_time = self.skyfieldTime(future_time)
+        utc = future_time.astimezone(datetime.timezone.utc)
+        jd, fr = jday(utc.year, utc.month, utc.day, utc.hour, utc.minute,
+                      utc.second + utc.microsecond / 1e6)
+
+        # r has the shape (N_sat, 1, 3)
+        _, r, _ = self.sat_array.sgp4(np.array([jd]), np.array([fr]))
+        theta, _ = theta_GMST1982(sfield_time.whole, sfield_time.ut1_fraction)
+        r_itrf = rot_z(-theta).dot(r[:, 0].T)
+        self.sat_itrf_km = r_itrf.T
+        self.sat_lat_deg, self.sat_lon_deg, self.sat_height_km = ecef_to_geodetic(self.sat_itrf_km)
+
+    def updateVesselPositions(self):
+        '''
+        Move all vessels one step along their waypoints.
+        '''
+        (self.vessel_lat_deg, self.vessel_lon_deg, self.vessel_current_index,
+         self.vessel_next_index, self.vessel_moving_forward) = advance_vessels(
+            self.vessel_lat_deg, self.vessel_lon_deg,
+            self.vessel_waypoints_lat, self.vessel_waypoints_lon,
+            self.vessel_num_waypoints, self.vessel_current_index,
+            self.vessel_next_index, self.vessel_moving_forward, self.vessel_speed)
+
+        for i, station in enumerate(self.moving_stations):
+            station.position = wgs84.latlon(self.vessel_lat_deg[i], self.vessel_lon_deg[i])
+
+        # Only the vessel rows of the station vectors change
+        first = len(self.ground_stations)
+        self.station_lat_deg[first:] = self.vessel_lat_deg
+        self.station_lon_deg[first:] = self.vessel_lon_deg
+        self.station_xyz_km[first:], self.station_up[first:] = surface_vectors(
+            self.vessel_lat_deg, self.vessel_lon_deg)
+
     def updatePositions(self, future_time: datetime.datetime):
-        sfield_time = self.ts.from_datetime(future_time)
-        positions = []
-        ground_positions = []
-        vessel_positions = []
+        # The values below come straight from the simulation arrays and already
+        # have the right types, so the API models are built with model_construct
+        # to skip pydantic validation of every entry on every tick.
 
         # Update satellite positions
-        for satellite in self.satellites:
-            satellite.geo = satellite.earth_sat.at(sfield_time)
-            lat, lon = wgs84.latlon_of(satellite.geo)
-            satellite.lat = lat
-            satellite.lon = lon
-            satellite.height = wgs84.height_of(satellite.geo)
-            
-            # Create position update
-            position = simapi.SatellitePosition(
-                name=satellite.name,
-                lat=float(satellite.lat.degrees),
-                lon=float(satellite.lon.degrees),
-                height=float(satellite.height.km)
-            )
-            positions.append(position)
+        self.propagateSatellites(future_time)
+        positions = [
+            simapi.SatellitePosition.model_construct(name=satellite.name, lat=lat, lon=lon, height=height)
+            for satellite, lat, lon, height in zip(self.satellites,
+                                                   self.sat_lat_deg.tolist(),
+                                                   self.sat_lon_deg.tolist(),
+                                                   self.sat_height_km.tolist())
+        ]
 
         # Add ground station positions
-        for station in self.ground_stations:
-            ground_pos = simapi.GroundStationPosition(
+        ground_positions = [
+            simapi.GroundStationPosition.model_construct(
                 name=station.name,
                 lat=float(station.position.latitude.degrees),
-                lon=float(station.position.longitude.degrees)
-            )
-            ground_positions.append(ground_pos)
+                lon=float(station.position.longitude.degrees))
+            for station in self.ground_stations
+        ]
 
         # Update moving station positions
-        for station in self.moving_stations:
-            station.update_position()  # Add this line to update vessel positions
-            vessel_pos = simapi.VesselPosition(
-                name=station.name,
-                lat=float(station.position.latitude.degrees),
-                lon=float(station.position.longitude.degrees)
-            )
-            vessel_positions.append(vessel_pos)
+        self.updateVesselPositions()
+        vessel_positions = [
+            simapi.VesselPosition.model_construct(name=station.name, lat=lat, lon=lon)
+            for station, lat, lon in zip(self.moving_stations,
+                                         self.vessel_lat_deg.tolist(),
+                                         self.vessel_lon_deg.tolist())
+        ]
 
         # Collect satellite-to-satellite links
-        satellite_links = []
-        for node1, node2 in self.graph.edges():
-            if node1.startswith('R') and node2.startswith('R'):  # Satellite nodes start with R
-                status = self.graph.edges[node1, node2].get("up", True)
-                satellite_links.append(simapi.Link(
-                    node1_name=node1,
-                    node2_name=node2,
-                    up=status
-                ))
+        satellite_links = [
+            simapi.Link.model_construct(node1_name=node1, node2_name=node2, up=up)
+            for (node1, node2), up in zip(self.sat_link_pairs, self.sat_link_up.tolist())
+        ]
 
         # Collect both ground station and vessel uplinks
         ground_uplinks = []
-        all_stations = self.ground_stations + self.moving_stations
-        for station in all_stations:
-            uplinks_list = []
-            for uplink in station.uplinks:
-                uplinks_list.append(simapi.UpLink(
-                    sat_node=uplink.satellite_name,
-                    distance=int(uplink.distance)
-                ))
+        for station in self.all_stations:
+            uplinks_list = [
+                simapi.UpLink.model_construct(sat_node=uplink.satellite_name, distance=int(uplink.distance))
+                for uplink in station.uplinks
+            ]
             if uplinks_list:
-                ground_uplinks.append(simapi.UpLinks(
+                ground_uplinks.append(simapi.UpLinks.model_construct(
                     ground_node=station.name,
                     uplinks=uplinks_list
                 ))
-            
+
         # Send position updates to API
-        data = simapi.GraphData(
+        data = simapi.GraphData.model_construct(
             satellites=positions,
             ground_stations=ground_positions,
             vessels=vessel_positions,
@@ -282,56 +438,84 @@ class SatSimulation:
             ground_uplinks=ground_uplinks
         )
         self.client.update_positions(data)
-        #print(f"{satellite.name} Lat: {satellite.lat}, Lon: {satellite.lon}, Hieght: {satellite.height.km}km")
-        print(f"{station.name} Lat: {station.position.latitude.degrees}, Lon: {station.position.longitude.degrees}")
-
-    @staticmethod
-    def nearby(ground_station: GroundStation, satellite: Satellite) -> bool:
-        return (satellite.lon.degrees > ground_station.position.longitude.degrees - 20 and
-                satellite.lon.degrees < ground_station.position.longitude.degrees + 20 and
-                satellite.lat.degrees > ground_station.position.latitude.degrees - 20 and 
-                satellite.lat.degrees < ground_station.position.latitude.degrees + 20)
-      
- 
+        if logger.isEnabledFor(logging.DEBUG):
+            for station in self.moving_stations:
+                logger.debug("%s Lat: %s, Lon: %s", station.name,
+                             station.position.latitude.degrees, station.position.longitude.degrees)
+
+    def nearbySatellites(self, lat: float, lon: float) -> np.ndarray:
+        '''
+        Return the indexes of the satellites within NEARBY_DEGREES of latitude and
+        longitude of the given point, in ascending order.
+
+        Uses the latitude index built by indexSatellites to only look at the band
+        of satellites with a matching latitude. Longitude differences wrap at
+        +/-180 so points either side of the antimeridian are near each other.
+        '''
+        lo = np.searchsorted(self.sat_lat_sorted, lat - SatSimulation.NEARBY_DEGREES, side='right')
+        hi = np.searchsorted(self.sat_lat_sorted, lat + SatSimulation.NEARBY_DEGREES, side='left')
+        candidates = self.sat_lat_order[lo:hi]
+        lon_diff = (self.sat_lon_deg[candidates] - lon + 180) % 360 - 180
+        candidates = candidates[np.abs(lon_diff) < SatSimulation.NEARBY_DEGREES]
+        return np.sort(candidates)
+
+    def indexSatellites(self):
+        '''
+        Sort the satellites by latitude for nearbySatellites.
+        '''
+        self.sat_lat_order = np.argsort(self.sat_lat_deg)
+        self.sat_lat_sorted = self.sat_lat_deg[self.sat_lat_order]
+
     def updateUplinkStatus(self, future_time: datetime.datetime):
         '''
         Update the links between ground stations and satellites
+
+        Uses the satellite positions from the last call to updatePositions, which
+        is expected to be for the same future_time.
         '''
         self.uplink_updates += 1
         zero_uplinks: bool = False
+        debug = logger.isEnabledFor(logging.DEBUG)
+        min_sin_elevation = np.sin(np.radians(self.min_elevation))
 
-        sfield_time = self.ts.from_datetime(future_time)
-        # Combined list for both types of stations
-        all_stations = self.ground_stations + self.moving_stations
-        
-        for station in all_stations:
+        self.indexSatellites()
+
+        for s, station in enumerate(self.all_stations):
             # Keep track of existing uplinks but update their parameters
             current_uplinks = {uplink.satellite_name: uplink for uplink in station.uplinks}
             station.uplinks = []
-            
-            for satellite in self.satellites:
-                # Calculate az for close satellites
-                if SatSimulation.nearby(station, satellite):
-                    difference = satellite.earth_sat - station.position
-                    topocentric = difference.at(sfield_time)
-                    alt, az, d = topocentric.altaz()
-                    if alt.degrees > self.min_elevation:
-                        delay = calculate_link_delay(d.km)
+
+            # Only consider close satellites. The sine of the elevation is the component of
+            # the station to satellite vector along the station's up vector.
+            nearby = self.nearbySatellites(self.station_lat_deg[s], self.station_lon_deg[s])
+            difference = self.sat_itrf_km[nearby] - self.station_xyz_km[s]
+            distance_km = np.linalg.norm(difference, axis=1)
+            sin_elevation = difference.dot(self.station_up[s]) / distance_km
+            visible = sin_elevation > min_sin_elevation
+
+            for i, d_km, sin_elev in zip(nearby[visible], distance_km[visible], sin_elevation[visible]):
+                satellite = self.satellites[i]
+                d_km = float(d_km)
+                delay = calculate_link_delay(d_km)
+                    
+                # Check if this is an existing uplink
+                if satellite.name in current_uplinks:
+                    # Update existing uplink with new distance and delay
+                    uplink = current_uplinks[satellite.name]
+                    uplink.distance = d_km
+                    uplink.delay = delay
+                else:
+                    # Create new uplink
+                    uplink = Uplink(satellite.name, station.name, d_km, delay=delay)
                         
-                        # Check if this is an existing uplink
-                        if satellite.name in current_uplinks:
-                            # Update existing uplink with new distance and delay
-                            uplink = current_uplinks[satellite.name]
-                            uplink.distance = d.km
-                            uplink.delay = delay
-                        else:
-                            # Create new uplink
-                            uplink = Uplink(satellite.name, station.name, d.km, delay=delay)
-                            
-                        station.uplinks.append(uplink)
-                        print(f"{satellite.name} Lat: {satellite.lat}, Lon: {satellite.lon}")
-                        print(f"{station.name} Lat: {station.position.latitude}, Lon: {station.position.longitude}")
-                        print(f"ground/vessel {station.name}, sat {satellite.name}: {alt}, {az}, {d.km}, delay: {delay}ms")
+                station.uplinks.append(uplink)
+                if debug:
+                    elevation = np.degrees(np.arcsin(sin_elev))
+                    logger.debug("%s Lat: %s, Lon: %s", satellite.name, self.sat_lat_deg[i], self.sat_lon_deg[i])
+                    logger.debug("%s Lat: %s, Lon: %s", station.name,
+                                 self.station_lat_deg[s], self.station_lon_deg[s])
+                    logger.debug("ground/vessel %s, sat %s: %.1fdeg, %s, delay: %sms",
+                                 station.name, satellite.name, elevation, d_km, delay)
                         
             if len(station.uplinks) == 0:
                 zero_uplinks = True
@@ -341,23 +525,24 @@ class SatSimulation:
 
     def updateInterPlaneStatus(self):
         inclination = self.graph.graph["inclination"]
-        for satellite in self.satellites:
-            # Track if state changed
-            satellite.prev_inter_plane_status = satellite.inter_plane_status
-            if satellite.lat.degrees > (inclination - 2) or satellite.lat.degrees < (
-                -inclination + 2
-            ):
-                # Above the threashold for inter plane links to connect
-                satellite.inter_plane_status = False
-            else:
-                satellite.inter_plane_status = True
+        # Track if state changed
+        self.prev_inter_plane_status[:] = self.inter_plane_status
+        # Inter plane links only connect below the threashold latitude
+        self.inter_plane_status[:] = ((self.sat_lat_deg <= inclination - 2) &
+                                      (self.sat_lat_deg >= -inclination + 2))
 
     def send_updates(self):
-        for satellite in self.satellites:
-            if satellite.prev_inter_plane_status != satellite.inter_plane_status:
-                for neighbor in self.graph.adj[satellite.name]: 
-                    if self.graph.edges[satellite.name, neighbor]["inter_ring"]:
-                        self.client.set_link_state(satellite.name, neighbor, satellite.inter_plane_status)
+        # Collect all inter plane link changes and send them in one call
+        link_changes = []
+        changed = np.flatnonzero(self.prev_inter_plane_status != self.inter_plane_status)
+        for i in changed.tolist():
+            name = self.satellites[i].name
+            status = bool(self.inter_plane_status[i])
+            for neighbor, link_index in self.inter_ring_neighbors[i]:
+                link_changes.append((name, neighbor, status))
+                self.sat_link_up[link_index] = status
+        if link_changes:
+            self.client.set_link_states(link_changes)
         
         # for ground_station in self.ground_stations:
         #     links = []
@@ -365,8 +550,7 @@ class SatSimulation:
         #         links.append((uplink.satellite_name, int(uplink.distance)))
         #     self.client.set_uplinks(ground_station.name, links)
         
-        all_stations = self.ground_stations + self.moving_stations
-        for station in all_stations:
+        for station in self.all_stations:
             links = []
             for uplink in station.uplinks:
                 links.append((uplink.satellite_name, int(uplink.distance), uplink.delay))
@@ -377,25 +561,31 @@ class SatSimulation:
         slice_delta = datetime.timedelta(seconds=SatSimulation.TIME_SLICE)
 
         # Generate positions for current time
-        print(f"update positions for {current_time}")
+        logger.info("update positions for %s", current_time)
         self.updatePositions(current_time)
         self.updateUplinkStatus(current_time)
         self.updateInterPlaneStatus()
         self.send_updates()
 
+        # Schedule ticks against the monotonic clock so compute time and
+        # sleep rounding do not accumulate into drift. current_time only
+        # drives the skyfield positions.
+        next_deadline = time.monotonic()
+
         while True:
             # Generate positions for next time step
             future_time = current_time + slice_delta
-            print(f"update positions for {future_time}")
+            logger.info("update positions for %s", future_time)
             self.updatePositions(future_time)
             self.updateUplinkStatus(future_time)
             self.updateInterPlaneStatus()
-            sleep_delta = future_time - datetime.datetime.now(tz=datetime.timezone.utc)
-            print(f"zero uplink % = {self.zero_uplink_count / self.uplink_updates}")
-            print("sleep")
+            uplink_count = sum(len(station.uplinks) for station in self.all_stations)
+            logger.info("%d uplinks, zero uplink %% = %s",
+                        uplink_count, self.zero_uplink_count / self.uplink_updates)
             if not self.calc_only:
-                # Wait until next time step thenupdate
-                time.sleep(sleep_delta.seconds)
+                # Wait until next time step then update
+                next_deadline += SatSimulation.TIME_SLICE
+                time.sleep(max(0.0, next_deadline - time.monotonic()))
                 self.send_updates()
             current_time = future_time
 
@@ -421,6 +611,7 @@ def usage():
     print("Usage: sim_sat [config-file] [--calc-ony]")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
     calc_only = False
     if "--calc-only" in sys.argv:
         # Only run calculations in a loop reporting data to the screen
@@ -1,5 +1,8 @@
+import collections
 import datetime
 from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import cached_property
 import threading
 import time
 from typing import List, Dict, Any
@@ -8,8 +11,9 @@ from fastapi import FastAPI, Request
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
 
 import sqlite3
@@ -20,10 +24,13 @@ from emulation.mnet.frr_topo import FrrSimRuntime
 from emulation import simapi
 
 
+# Context locking:
+#   The context lock is a threading.Lock that serializes access to the FRR runtime.
+#   FastAPI runs the non-async endpoints on its thread pool, so waiting for the lock
+#   does not block the event loop. Satellite positions are published as immutable
+#   snapshots and are read and written without the lock.
+#
 # TODO:
-# Open issue around context locking:
-#   We block the calling thread with a lock. Is there a problem between
-#   this and the asyncio model are are using with the server?
 # Add a static page with
 # - status
 # - shutdown links
@@ -31,6 +38,33 @@ from emulation import simapi
 # Surpress error on shutdown
 
 
+@dataclass(frozen=True)
+class PositionsSnapshot:
+    """
+    The positions and links reported in the last update from the satellite simulator.
+
+    Never modified after creation. Updates replace the whole snapshot.
+    """
+    satellites: List[simapi.SatellitePosition] = field(default_factory=list)
+    ground_stations: List[simapi.GroundStationPosition] = field(default_factory=list)
+    vessels: List[simapi.VesselPosition] = field(default_factory=list)
+    satellite_links: List[simapi.Link] = field(default_factory=list)
+    ground_uplinks: List[simapi.UpLinks] = field(default_factory=list)
+
+    @cached_property
+    def json(self) -> bytes:
+        """
+        The snapshot encoded as a GraphData JSON document, built on first use.
+        """
+        data = simapi.GraphData.model_construct(
+            satellites=self.satellites,
+            ground_stations=self.ground_stations,
+            vessels=self.vessels,
+            satellite_links=self.satellite_links,
+            ground_uplinks=self.ground_uplinks)
+        return data.model_dump_json().encode()
+
+
 class NetxContext:
     """
     References key simulation resources and protects against multi-threaded access.
@@ -41,22 +75,19 @@ class NetxContext:
         self.events = []
         self.start_time = datetime.datetime.now()
         self.lock = threading.Lock()
-        self.satellite_positions = []
-        self.ground_station_positions = []
-        self.vessel_positions = []  # Add vessel positions list
-        self.satellite_links = []
-        self.ground_uplinks = []
+        self.positions = PositionsSnapshot()
 
     def update_satellite_positions(self, positions: List[simapi.SatellitePosition], 
                                  ground_positions: List[simapi.GroundStationPosition],
                                  vessel_positions: List[simapi.VesselPosition],  # Add vessel positions
                                  sat_links: List[simapi.Link],
                                  ground_links: List[simapi.UpLinks]):
-        self.satellite_positions = positions
-        self.ground_station_positions = ground_positions
-        self.vessel_positions = vessel_positions  # Store vessel positions
-        self.satellite_links = sat_links
-        self.ground_uplinks = ground_links
+        """
+        Publish a new positions snapshot. Safe to call without holding the lock.
+        """
+        # Replacing the reference is atomic, readers see either the old or new snapshot
+        self.positions = PositionsSnapshot(positions, ground_positions, vessel_positions,
+                                           sat_links, ground_links)
 
     def add_event(self, event: str):
         self.events.append((datetime.datetime.now(), event))
@@ -77,6 +108,67 @@ class NetxContext:
 global_context: NetxContext = None
 
 
+class MonitorConnections:
+    """
+    Connections to the monitoring databases, kept open between requests.
+
+    FastAPI runs the sync endpoints on its thread pool, so each connection has
+    a lock that serializes its use. The least recently used connection is
+    closed once more than MAX_OPEN are open.
+    """
+    MAX_OPEN = 32
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections: collections.OrderedDict[str, tuple[sqlite3.Connection, threading.Lock]] = \
+            collections.OrderedDict()
+
+    @contextmanager
+    def connection(self, db_path: str):
+        """
+        Use the connection to a database, opening it if needed. The database
+        is opened read only so a missing file is not created.
+        """
+        while True:
+            evicted = None
+            with self.lock:
+                entry = self.connections.get(db_path)
+                if entry is None:
+                    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True,
+                                           check_same_thread=False)
+                    entry = (conn, threading.Lock())
+                    self.connections[db_path] = entry
+                    if len(self.connections) > MonitorConnections.MAX_OPEN:
+                        evicted = self.connections.popitem(last=False)[1]
+                else:
+                    self.connections.move_to_end(db_path)
+            if evicted is not None:
+                with evicted[1]:
+                    evicted[0].close()
+            conn, conn_lock = entry
+            with conn_lock:
+                # Open again if the connection was closed while waiting for the lock
+                with self.lock:
+                    current = self.connections.get(db_path) is entry
+                if current:
+                    yield conn
+                    return
+
+    def close(self):
+        """
+        Close all connections, before the databases are removed.
+        """
+        with self.lock:
+            entries = list(self.connections.values())
+            self.connections.clear()
+        for conn, conn_lock in entries:
+            with conn_lock:
+                conn.close()
+
+
+monitor_connections = MonitorConnections()
+
+
 @contextmanager
 def get_context():
     """"
@@ -118,8 +210,12 @@ def run(frrt: FrrSimRuntime):
     bg_thread = threading.Thread(target=background_thread)
     bg_thread.daemon = True
     bg_thread.start()
-    server.run()
-    run_thread = False
+    try:
+        server.run()
+    finally:
+        run_thread = False
+        # The runtime removes the working dbs when the routers stop
+        monitor_connections.close()
 
 
 # Mount static files directory
@@ -215,8 +311,8 @@ def view_router(request: Request, node: str):
         router["lon"] = None
         router["height"] = None
 
-        # If this node is a satellite, find its lat/long/alt from context.satellite_positions
-        for sat in context.satellite_positions:
+        # If this node is a satellite, find its lat/long/alt from the positions snapshot
+        for sat in context.positions.satellites:
             if sat.name == node:
                 router["lat"] = sat.lat
                 router["lon"] = sat.lon
@@ -262,6 +358,25 @@ def set_link(link: simapi.Link):
         return {"error": err}
     return {"status": "OK"}
 
+@app.put("/links")
+def set_links(links: list[simapi.Link]):
+    """
+    Set a list of links up or down, in order
+    """
+    errors = []
+    with get_context() as context:
+        for link in links:
+            state = "up" if link.up else "down"
+            context.add_event(f"set link {link.node1_name} - {link.node2_name} {state}")
+            err = context.frrt.set_link_state(
+                link.node1_name, link.node2_name, link.up
+            )
+            if err is not None:
+                errors.append(err)
+    if errors:
+        return {"error": errors}
+    return {"status": "OK"}
+
 @app.put("/uplinks")
 def set_uplinks(uplinks: simapi.UpLinks):
     """
@@ -292,76 +407,77 @@ async def shutdown():
 
 @app.get("/positions")
 def get_positions():
-    with get_context() as context:
-        return {
-            "satellites": context.satellite_positions,
-            "ground_stations": context.ground_station_positions,
-            "vessels": context.vessel_positions,
-            "satellite_links": context.satellite_links,
-            "ground_uplinks": context.ground_uplinks
-        }
+    # Positions are an immutable snapshot, no need to take the context lock.
+    # Return the snapshot's cached encoding rather than having FastAPI convert
+    # every model with jsonable_encoder and the stdlib json module on each request.
+    return Response(content=global_context.positions.json, media_type="application/json")
 
 @app.put("/positions")
-def update_positions(positions: simapi.GraphData):
-    with get_context() as context:
-        context.update_satellite_positions(
-            positions.satellites,
-            positions.ground_stations,
-            positions.vessels,
-            positions.satellite_links,
-            positions.ground_uplinks
-        )
+async def update_positions(request: Request):
+    # Parse and validate the JSON body in one pass. This is much faster for the large
+    # position updates than FastAPI's default of decoding to a dict and then validating.
+    try:
+        positions = simapi.GraphData.model_validate_json(await request.body())
+    except ValidationError as e:
+        return JSONResponse(status_code=422, content={"error": str(e)})
+    global_context.update_satellite_positions(
+        positions.satellites,
+        positions.ground_stations,
+        positions.vessels,
+        positions.satellite_links,
+        positions.ground_uplinks
+    )
     return {"status": "OK"}
 
+def monitor_databases(context: NetxContext) -> dict:
+    """The master and working databases of the runtime"""
+    return {
+        "master": context.frrt.db_file,
+        "nodes": {
+            name: node.working_db 
+            for name, node in context.frrt.nodes.items()
+        }
+    }
+
 @app.get("/monitor/databases")
 def get_database_list():
     """Get list of all monitoring databases"""
     with get_context() as context:
-        databases = {
-            "master": context.frrt.db_file,
-            "nodes": {
-                name: node.working_db 
-                for name, node in context.frrt.nodes.items()
-            }
-        }
-        return databases
+        return monitor_databases(context)
 
 @app.get("/monitor/data/{db_path:path}")
 def get_database_data(db_path: str):
-    """Get contents of a specific database"""
+    """
+    Get contents of a specific database
+
+    Only the databases listed by /monitor/databases can be read.
+    Rows are returned as lists of values in the order of columns.
+    """
+    with get_context() as context:
+        databases = monitor_databases(context)
+    if db_path != databases["master"] and db_path not in databases["nodes"].values():
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Unknown database: {db_path}"}
+        )
+
     try:
-        # Connect to database
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Get column names
-        cursor.execute("PRAGMA table_info(targets);")
-        columns = [col[1] for col in cursor.fetchall()]
-        
-        # Get all data
-        cursor.execute("SELECT * FROM targets;")
-        rows = cursor.fetchall()
-        
-        # Convert to list of dicts for better JSON serialization
-        data = []
-        for row in rows:
-            row_dict = {}
-            for i, col in enumerate(columns):
-                row_dict[col] = row[i]
-            data.append(row_dict)
-            
-        # Get some statistics
-        cursor.execute("SELECT COUNT(*) FROM targets WHERE responded = TRUE")
-        responding = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM targets")
-        total = cursor.fetchone()[0]
-        
-        conn.close()
+        with monitor_connections.connection(db_path) as conn:
+            cursor = conn.cursor()
+
+            # Get all data, the column names come from the cursor description
+            cursor.execute("SELECT * FROM targets;")
+            columns = [col[0] for col in cursor.description]
+            rows = cursor.fetchall()
+
+            # Get some statistics
+            cursor.execute("SELECT COUNT(*), COUNT(*) FILTER (WHERE responded = TRUE) FROM targets")
+            total, responding = cursor.fetchone()
+            cursor.close()
         
         return {
             "columns": columns,
-            "data": data,
+            "data": rows,
             "stats": {
                 "total": total,
                 "responding": responding,
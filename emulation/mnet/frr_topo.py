@@ -34,8 +34,12 @@ import datetime
 import shutil
 import random
 import socket
+import collections
+import concurrent.futures
+import sqlite3
 import typing
 from dataclasses import dataclass, field
+from functools import lru_cache
 
 import networkx
 import mininet.topo
@@ -50,6 +54,49 @@ from emulation import simapi
 from emulation.mnet import pmonitor
 
 
+@lru_cache(maxsize=None)
+def frr_user() -> pwd.struct_passwd:
+    '''
+    Return the password entry of the frr user. Looked up once per process.
+    '''
+    return pwd.getpwnam("frr")
+
+
+@lru_cache(maxsize=None)
+def frrvty_gid() -> int:
+    '''
+    Return the group id of the frrvty group. Looked up once per process.
+    '''
+    return grp.getgrnam("frrvty").gr_gid
+
+
+def update_hosts_file(path: str, entries: list[str], add: bool) -> None:
+    '''
+    Add or remove lines in a hosts file with a single read and write.
+
+    Args:
+        path (str): Path of the hosts file.
+        entries (list[str]): Lines to add or remove.
+        add (bool): True to append the entries, False to remove them.
+    '''
+    if add:
+        with open(path, "ab+") as f:
+            # Start on a new line if the file does not end with one
+            prefix = b""
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    prefix = b"\n"
+            f.write(prefix + "".join(entry + "\n" for entry in entries).encode())
+        return
+
+    remove = set(entries)
+    with open(path) as f:
+        lines = f.readlines()
+    kept = [line for line in lines if line.rstrip("\n") not in remove]
+    if len(kept) != len(lines):
+        with open(path, "w") as f:
+            f.writelines(kept)
 
 
 class RouteNode(mininet.node.Node):
@@ -121,9 +168,15 @@ class MNetNodeWrap:
         self.default_ip : str = default_ip
         self.node : mininet.node.Node = None
         fd, self.working_db = tempfile.mkstemp(suffix=".sqlite")
-        open(fd, "r").close()
+        os.close(fd)
         print(f"{self.name} db file {self.working_db}")
         self.last_five_pings = []
+        # Connection to working_db, opened on first use and kept until stopMonitor
+        self.db_conn: sqlite3.Connection = None
+        # True while a monitor process is running for the node
+        self.monitor_started: bool = False
+        # IP of the mininet node's default interface, looked up on first use after start
+        self.cached_default_ip: str = None
  
     def sendCmd(self, command :str):
         '''
@@ -145,6 +198,7 @@ class MNetNodeWrap:
         '''
 
         self.node = net.getNodeByName(self.name)
+        self.cached_default_ip = None
 
     def waitOutput(self) -> None:
         if self.node is not None:
@@ -171,6 +225,7 @@ class MNetNodeWrap:
             f"python3 -m emulation.mnet.pmonitor monitor '{db_master_file}' '{self.working_db}' {self.defaultIP()} >> /dev/null 2>&1  &"
         )
         pmonitor.set_running(db_master, self.defaultIP(), True)
+        self.monitor_started = True
 
     def stopMonitor(self, db_master):
         '''
@@ -181,7 +236,42 @@ class MNetNodeWrap:
         '''
 
         pmonitor.set_can_run(db_master, self.defaultIP(), False)
+        self.monitor_started = False
+        if self.db_conn is not None:
+            self.db_conn.close()
+            self.db_conn = None
         os.unlink(self.working_db)
+        # Remove any WAL mode side files
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(self.working_db + suffix):
+                os.unlink(self.working_db + suffix)
+
+    def monitor_ready(self) -> bool:
+        '''
+        Check if the node's monitor process has started writing the working database.
+
+        Returns:
+            bool: True if monitoring results can be read.
+        '''
+
+        if not self.monitor_started:
+            return False
+        # The monitor process creates the schema after it starts. Once the
+        # connection is open there is no need to check the file again.
+        return self.db_conn is not None or os.path.getsize(self.working_db) > 0
+
+    def monitor_db(self) -> sqlite3.Connection:
+        '''
+        Get the connection to the node's working database, opening it on first use.
+
+        Returns:
+            sqlite3.Connection: Open connection to the working database.
+        '''
+
+        if self.db_conn is None:
+            # Used by the API and background threads while holding the context lock
+            self.db_conn = pmonitor.open_db(self.working_db, check_same_thread=False)
+        return self.db_conn
 
     def update_monitor_stats(self) -> Tuple[int, int]:
         '''
@@ -191,11 +281,10 @@ class MNetNodeWrap:
             tuple[int, int]: Counts of successful and total samples.
         '''
         # Only get stats if DB is being used
-        if os.path.getsize(self.working_db) > 0:
-            db = pmonitor.open_db(self.working_db)
+        if self.monitor_ready():
+            db = self.monitor_db()
             good, total = pmonitor.get_status_count(db, self.stable_node())
             self.last_five_pings = pmonitor.get_last_five(db)
-            db.close()
             return good, total
 
         # Return default values when DB is not in use or empty
@@ -209,8 +298,13 @@ class MNetNodeWrap:
             str: The default IP address.
         '''
 
-        if self.node is not None and self.node.defaultIntf() is not None:
-            return self.node.defaultIntf().ip
+        if self.cached_default_ip is not None:
+            return self.cached_default_ip
+        if self.node is not None:
+            intf = self.node.defaultIntf()
+            if intf is not None:
+                self.cached_default_ip = intf.ip
+                return self.cached_default_ip
         return self.default_ip
 
     def stable_node(self) -> bool:
@@ -224,7 +318,7 @@ class MNetNodeWrap:
         return True
 
 
-@dataclass
+@dataclass(slots=True)
 class IPPoolEntry:
     network: ipaddress.IPv4Network
     ip1: ipaddress.IPv4Interface
@@ -232,7 +326,7 @@ class IPPoolEntry:
     used: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class Uplink:
     sat_name: str
     distance: int
@@ -250,11 +344,14 @@ class GroundStation(MNetNodeWrap):
 
     def __init__(self, name: str, default_ip: str, uplinks: list[dict[str,typing.Any]]) -> None:
         super().__init__(name, default_ip)
-        self.uplinks: list[Uplink] = []
+        # Established uplinks keyed by satellite name
+        self.uplinks: dict[str, Uplink] = {}
         self.ip_pool: list[IPPoolEntry] = []
         for link in uplinks:
             entry = IPPoolEntry(network=link["nw"], ip1=link["ip1"], ip2=link["ip2"])
             self.ip_pool.append(entry)
+        # Unused pool entries, allocated from the front and returned to the back
+        self.free_pool: collections.deque[IPPoolEntry] = collections.deque(self.ip_pool)
 
     def stable_node(self) -> bool:
         '''
@@ -270,23 +367,20 @@ class GroundStation(MNetNodeWrap):
         return False
 
     def has_uplink(self, sat_name: str) -> bool:
-        for uplink in self.uplinks:
-            if uplink.sat_name == sat_name:
-                return True
-        return False
+        return sat_name in self.uplinks
 
     def sat_links(self) -> list[str]:
         '''
         Return a list of satellite names to which we have uplinks
         '''
-        return [uplink.sat_name for uplink in self.uplinks]
+        return list(self.uplinks)
 
     def _get_pool_entry(self) -> IPPoolEntry | None:
-        for entry in self.ip_pool:
-            if not entry.used:
-                entry.used = True
-                return entry
-        return None
+        if not self.free_pool:
+            return None
+        entry = self.free_pool.popleft()
+        entry.used = True
+        return entry
 
     def add_uplink(self, sat_name: str, distance: int) -> Uplink | None:
         '''
@@ -304,7 +398,9 @@ class GroundStation(MNetNodeWrap):
         if pool_entry is None:
             return None
         uplink = Uplink(sat_name, distance, pool_entry)
-        self.uplinks.append(uplink)
+        self.uplinks[sat_name] = uplink
+        # The default interface may change with the set of interfaces
+        self.cached_default_ip = None
         return uplink
 
     def remove_uplink(self, sat_name: str) -> Uplink|None:
@@ -318,12 +414,12 @@ class GroundStation(MNetNodeWrap):
             Uplink | None: The removed uplink, or None if the uplink doesn't exist.
         '''
 
-        for entry in self.uplinks:
-            if entry.sat_name == sat_name:
-                entry.ip_pool_entry.used = False
-                self.uplinks.remove(entry)
-                return entry
-        return None
+        entry = self.uplinks.pop(sat_name, None)
+        if entry is not None:
+            entry.ip_pool_entry.used = False
+            self.free_pool.append(entry.ip_pool_entry)
+            self.cached_default_ip = None
+        return entry
 
 
 class FrrRouter(MNetNodeWrap):
@@ -343,6 +439,8 @@ class FrrRouter(MNetNodeWrap):
         self.vtysh = None
         self.daemons = None
         self.ospf = None
+        # Reused for reading replies from the FRR daemons
+        self.recv_buf = bytearray(16384)
 
     def configure(self, vtysh: str, daemons: str, ospf: str) -> None:
         '''
@@ -376,13 +474,13 @@ class FrrRouter(MNetNodeWrap):
             print("Warning: not running FRR")
             return
 
-        uinfo = pwd.getpwnam("frr")
+        uinfo = frr_user()
 
         if not os.path.exists(cfg_dir):
             # sudo install -m 775 -o frr -g frrvty -d {cfg_dir}
             print(f"create {cfg_dir}")
             os.makedirs(cfg_dir, mode=0o775)
-            gid = grp.getgrnam("frrvty").gr_gid
+            gid = frrvty_gid()
             os.chown(cfg_dir, uinfo.pw_uid, gid)
 
         # sudo install -m 775 -o frr -g frr -d  {log_dir}
@@ -437,31 +535,71 @@ class FrrRouter(MNetNodeWrap):
         result = True
         try:
             sock.connect(path)
-            msg = b'enable\x00'
-            result = result and self._send_frr_cmd(sock, msg)
-            msg = b'conf term file-lock\x00'
-            result = result and self._send_frr_cmd(sock, msg)
-            for command in commands:
-                print(f"sending command {command} to {self.name}")
-                msg = (command + '\x00').encode("ascii")
-                result = result and self._send_frr_cmd(sock, msg)
-            msg = b'end\x00'
-            self._send_frr_cmd(sock, msg)
-            msg = b'disable\x00'
-            self._send_frr_cmd(sock, msg)
+            # Enter config mode first. No commands are sent if that fails, for
+            # example when another client holds the config lock.
+            result = self._send_frr_cmds(sock, [b'enable\x00', b'conf term file-lock\x00'])
+            if result:
+                # Send all commands in one write and then collect the replies.
+                # A failed command does not stop the commands sent after it.
+                msgs = []
+                for command in commands:
+                    print(f"sending command {command} to {self.name}")
+                    msgs.append((command + '\x00').encode("ascii"))
+                result = self._send_frr_cmds(sock, msgs)
+            # Results of end and disable are not checked
+            self._send_frr_cmds(sock, [b'end\x00', b'disable\x00'])
         except TimeoutError:
             print("timout connecting to FRR")
             result = False
+        except OSError as e:
+            # The daemon closed the connection
+            print(f"error sending commands to FRR: {e}")
+            result = False
         sock.close()
         return result
 
-    def _send_frr_cmd(self, sock, msg: bytes) -> bool:
-        sock.sendall(msg)
-        data = sock.recv(10000)
-        size = len(data)
-        if size > 0 and data[size-1] == 0:
-            return True
-        return False
+    def _send_frr_cmds(self, sock, msgs: list[bytes]) -> bool:
+        '''
+        Send commands to an FRR daemon in one write and read their replies.
+
+        Returns:
+            bool: True if a reply was received for every command and all succeeded.
+        '''
+
+        sock.sendall(b''.join(msgs))
+        status = self._read_frr_replies(sock, len(msgs))
+        return len(status) == len(msgs) and not any(status)
+
+    def _read_frr_replies(self, sock, count: int) -> list[int]:
+        '''
+        Read replies to commands sent to an FRR daemon.
+
+        Each reply is the command output followed by three NUL bytes and a
+        status byte, which is 0 for success.
+
+        Args:
+            sock (socket.socket): Socket connected to the daemon.
+            count (int): Number of replies to read.
+
+        Returns:
+            list[int]: Status of each reply received. Shorter than count if
+            the daemon closed the connection.
+        '''
+
+        status = []
+        pending = bytearray()
+        while len(status) < count:
+            size = sock.recv_into(self.recv_buf)
+            if size == 0:
+                break
+            pending += memoryview(self.recv_buf)[:size]
+            while True:
+                end = pending.find(b'\x00\x00\x00')
+                if end < 0 or end + 3 >= len(pending):
+                    break
+                status.append(pending[end + 3])
+                del pending[:end + 4]
+        return status
 
     def write_cfg_file(self, file_path: str, contents: str, uid: int, gid: int) -> None:
         if self.no_frr:
@@ -509,6 +647,10 @@ class NetxTopo(mininet.topo.Topo):
         self.routers: list[FrrRouter] = []
         self.ground_stations: list[GroundStation] = []
         self.vessels: list[Vessel] = []  # Add vessels list
+        # Node names by type. The set of nodes is fixed once the topology is built.
+        self.satellite_names: list[str] = torus_topo.satellites(graph)
+        self.ground_station_names: list[str] = torus_topo.ground_stations(graph)
+        self.vessel_names: list[str] = torus_topo.vessels(graph)
         super().__init__()
 
     def build(self, *args, **params):
@@ -520,7 +662,7 @@ class NetxTopo(mininet.topo.Topo):
             - Links between nodes based on the graph edges.
         '''
         # Create routers
-        for name in torus_topo.satellites(self.graph):
+        for name in self.satellite_names:
             node = self.graph.nodes[name]
             ip = node.get("ip")
             ip_intf = None
@@ -542,7 +684,7 @@ class NetxTopo(mininet.topo.Topo):
             )
 
         # Handle ground stations
-        for name in torus_topo.ground_stations(self.graph):
+        for name in self.ground_station_names:
             node = self.graph.nodes[name]
             ip = node.get("ip")
             ip_intf = None
@@ -555,7 +697,7 @@ class NetxTopo(mininet.topo.Topo):
             self.ground_stations.append(station)
 
         # Handle vessels
-        for name in torus_topo.vessels(self.graph):
+        for name in self.vessel_names:
             node = self.graph.nodes[name]
             ip = node.get("ip")
             ip_intf = None
@@ -575,7 +717,7 @@ class NetxTopo(mininet.topo.Topo):
             # Handle incomplete edges
             if edge.get("ip") is None:
                 self.addLink(router1, router2)
-                return
+                continue
 
             ip1 = edge["ip"][router1]
             intf1 = edge["intf"][router1]
@@ -598,6 +740,11 @@ class FrrSimRuntime:
     '''
     Code for the FRR / Mininet / Monitoring functions.
     '''
+    # Maximum number of threads used to start and stop nodes in parallel
+    MAX_WORKERS = 64
+    # Number of monitoring stats samples kept
+    MAX_STAT_SAMPLES = 200
+
     def __init__(self, topo: NetxTopo, net: mininet.net.Mininet, stable_monitor: bool =False):
         self.graph = topo.graph
         self.nodes: dict[str, MNetNodeWrap] = {}
@@ -608,8 +755,12 @@ class FrrSimRuntime:
 
         # Create monitoring DB file.
         fd, self.db_file = tempfile.mkstemp(suffix=".sqlite")
-        open(fd, "r").close()
+        os.close(fd)
         print(f"Master db file {self.db_file}")
+        # Connection to the master db held for the life of the runtime
+        self.db_master: sqlite3.Connection = pmonitor.open_db(self.db_file, check_same_thread=False)
+        # Working dbs of the nodes that run a monitor, set by start_routers
+        self.working_dbs: list[str] = []
 
         for frr_router in topo.routers:
             self.nodes[frr_router.name] = frr_router
@@ -621,13 +772,23 @@ class FrrSimRuntime:
             self.nodes[vessel.name] = vessel
             self.vessels[vessel.name] = vessel
 
-        self.stat_samples = []
+        # Last five pings of each node, refreshed by update_monitor_stats
+        self.last_five_stats: dict[str, list[tuple[str,bool]]] = {
+            node.name: node.last_five_pings for node in self.nodes.values()}
+        # Most recent monitoring stats samples, oldest dropped first
+        self.stat_samples: collections.deque = collections.deque(maxlen=FrrSimRuntime.MAX_STAT_SAMPLES)
+        # Router and link lists with formatted IPs, built on first request.
+        # The topology does not change once built.
+        self.router_list: list[tuple[str,str]] = None
+        self.link_list: list[tuple[str,str,str]] = None
         self.net = net
         self.stub_net = False
         # If net is none, we are running in a stub mode without mininet or FRR.
         if self.net is None:
             self.net = StubMininet()
             self.stub_net = True
+        # Source of the made up monitoring stats in stub mode
+        self.rng = random.Random()
 
     def start_routers(self) -> None:
         '''
@@ -646,33 +807,29 @@ class FrrSimRuntime:
         #GroundStations
         for station in self.ground_stations.values():
             data.append((station.name, station.defaultIP(), station.stable_node()))
-        pmonitor.init_targets(self.db_file, data)
         #Vessels
         for vessel in self.vessels.values(): 
-            data.append((vessel.name, vessel.defaultIP(), vessel.stable_node()))  # <-- Add this
-        pmonitor.init_targets(self.db_file, data)
+            data.append((vessel.name, vessel.defaultIP(), vessel.stable_node()))
+        pmonitor.init_targets(self.db_file, data, self.db_master)
 
         # Start all nodes
-        for node in self.nodes.values():
-            node.start(self.net)
+        self._for_each_node(lambda node: node.start(self.net), self.nodes.values())
 
         # Wait for start to complete.
-        for node in self.nodes.values():
-            node.waitOutput()
+        self._for_each_node(lambda node: node.waitOutput(), self.nodes.values())
 
         # Start monitoring on all nodes
-        db_master = pmonitor.open_db(self.db_file)
-        for node in self.nodes.values():
-            # Start monitor if node is not considered always reachable
-            # or we are running monitoring from the stable nodes.
-            if self.stable_monitor or not node.stable_node():
-                node.startMonitor(self.db_file, db_master)
-        db_master.close()
+        # Start monitor if node is not considered always reachable
+        # or we are running monitoring from the stable nodes.
+        monitored = [node for node in self.nodes.values()
+                     if self.stable_monitor or not node.stable_node()]
+        # Sequential as this updates the master db through a single connection
+        for node in monitored:
+            node.startMonitor(self.db_file, self.db_master)
+            self.working_dbs.append(node.working_db)
 
         # Wait for monitoring to start
-        for node in self.nodes.values():
-            if self.stable_monitor or not node.stable_node():
-                node.waitOutput()
+        self._for_each_node(lambda node: node.waitOutput(), monitored)
 
     def stop_routers(self):
         '''
@@ -682,25 +839,48 @@ class FrrSimRuntime:
         '''
 
         # Stop monitor on all nodes
-        db_master = pmonitor.open_db(self.db_file)
         for node in self.nodes.values():
-            node.stopMonitor(db_master)
-        db_master.close()
+            node.stopMonitor(self.db_master)
 
-        for node in self.nodes.values():
-            node.stop()
+        self._for_each_node(lambda node: node.stop(), self.nodes.values())
 
         # Wait for commands to complete - important!.
         # Otherwise processes may not shut down.
-        for node in self.nodes.values():
-            node.waitOutput()
-        os.unlink(self.db_file)
+        self._for_each_node(lambda node: node.waitOutput(), self.nodes.values())
+        self.close()
+
+    def _for_each_node(self, func: typing.Callable[[MNetNodeWrap], typing.Any],
+                       nodes: typing.Iterable[MNetNodeWrap]) -> None:
+        '''
+        Call func for every node, running the calls in parallel.
+
+        Each node is only used by one thread. Returns when all calls are complete
+        and raises the first exception from any of the calls.
+        '''
+
+        nodes = list(nodes)
+        workers = max(1, min(FrrSimRuntime.MAX_WORKERS, len(nodes)))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(func, nodes):
+                pass
+
+    def close(self) -> None:
+        '''
+        Close the master database connection and remove the master db files.
+        '''
+
+        if self.db_master is not None:
+            self.db_master.close()
+            self.db_master = None
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_file + suffix):
+                os.unlink(self.db_file + suffix)
 
     def update_monitor_stats(self):
         '''
         Update monitoring statistics for all nodes in the simulation.
 
-        Updates the `stat_samples` list with the latest counts of successful and total samples.
+        Updates the `stat_samples` deque with the latest counts of successful and total samples.
         '''
 
         stable_good_count: int = 0
@@ -709,13 +889,13 @@ class FrrSimRuntime:
         dynamic_total_count: int = 0
 
         if self.stub_net:
-            stable_good_count: int = random.randrange(20)
-            stable_total_count: int = random.randrange(20) + stable_good_count
-            dynamic_good_count: int = random.randrange(20)
-            dynamic_total_count: int = random.randrange(20) + dynamic_good_count
+            stable_good_count, stable_extra, dynamic_good_count, dynamic_extra = self.rng.choices(range(20), k=4)
+            stable_total_count: int = stable_extra + stable_good_count
+            dynamic_total_count: int = dynamic_extra + dynamic_good_count
         else:
             for node in self.nodes.values():
                 good, total = node.update_monitor_stats()
+                self.last_five_stats[node.name] = node.last_five_pings
                 if node.stable_node():
                     stable_good_count += good
                     stable_total_count += total
@@ -726,8 +906,6 @@ class FrrSimRuntime:
         self.stat_samples.append((datetime.datetime.now(), 
                                     stable_good_count, stable_total_count,
                                     dynamic_good_count, dynamic_total_count))
-        if len(self.stat_samples) > 200:
-            self.stat_samples.pop(0)
 
     def get_last_five_stats(self) -> dict[str, list[tuple[str,bool]]]:
         '''
@@ -737,10 +915,7 @@ class FrrSimRuntime:
             dict[str, list[tuple[str, bool]]]: Dictionary mapping node names to their last five samples.
         '''
 
-        result: dict[str, list[tuple[str,bool]]] = {}
-        for node in self.nodes.values():
-            result[node.name] = node.last_five_pings
-        return result
+        return self.last_five_stats
 
     def sample_stats(self):
         self.update_monitor_stats()
@@ -748,10 +923,8 @@ class FrrSimRuntime:
     def get_node_status_list(self, name: str):
         node = self.nodes[name]
         result = []
-        if not self.stub_net and os.path.getsize(node.working_db) > 0:
-            db_working = pmonitor.open_db(node.working_db)
-            result = pmonitor.get_status_list(db_working)
-            db_working.close()
+        if not self.stub_net and node.monitor_ready():
+            result = pmonitor.get_status_list(node.monitor_db())
         return result
 
     def get_stat_samples(self):
@@ -764,8 +937,11 @@ class FrrSimRuntime:
         return self.graph.graph["ring_list"]
 
     def get_router_list(self) -> list[tuple[str,str]]:
+        if self.router_list is not None:
+            return self.router_list
         result = []
-        for name in torus_topo.satellites(self.graph):
+        # Routers are in the order of the graph's satellite nodes
+        for name in self.routers:
             node = self.graph.nodes[name]
             ip = ""
             if node.get("ip") is not None:
@@ -773,17 +949,17 @@ class FrrSimRuntime:
             else:
                 ip = ""
             result.append((name, ip))
+        self.router_list = result
         return result
 
     def get_link_list(self) -> list[tuple[str,str,str]]:
+        if self.link_list is not None:
+            return self.link_list
         result = []
-        for edge in self.graph.edges:
-            node1 = edge[0]
-            node2 = edge[1]
-            ip_str = []
-            for ip in self.graph.edges[node1, node2]["ip"].values():
-                ip_str.append(format(ip))
-            result.append((node1, node2, "-".join(ip_str)))
+        for node1, node2, ips in self.graph.edges(data="ip"):
+            ip_str = "-".join(format(ip) for ip in ips.values())
+            result.append((node1, node2, ip_str))
+        self.link_list = result
         return result
 
     def get_link(self, node1: str, node2: str):
@@ -874,6 +1050,9 @@ class FrrSimRuntime:
                         uplink.ip_pool_entry.ip2,
                         link.delay
                     )
+            else:
+                # Keep the distance current so the default route follows the closest satellite
+                station.uplinks[link.sat_node].distance = link.distance
             seen_links.add(link.sat_node)
             # Update delay for the link whether it's new or existing
             self.update_link_delay(station_name, link.sat_node, link.delay)
@@ -884,14 +1063,16 @@ class FrrSimRuntime:
             for sat_name in existing_links:
                 if sat_name not in seen_links:
                     print(f"Remove uplink {station.name} - {sat_name}")
-                    uplink = station.remove_uplink(sat_name)
-                    if uplink:  # Make sure we have an uplink to remove
-                        self._remove_link(
-                            station_name, 
-                            sat_name, 
-                            uplink.ip_pool_entry.network,
-                            uplink.ip_pool_entry.ip1
-                        )
+                    # Remove the link while the station still has the uplink,
+                    # so its DNS entries can be found
+                    uplink = station.uplinks[sat_name]
+                    self._remove_link(
+                        station_name, 
+                        sat_name, 
+                        uplink.ip_pool_entry.network,
+                        uplink.ip_pool_entry.ip1
+                    )
+                    station.remove_uplink(sat_name)
 
         self._update_default_route(station)
         return True
@@ -934,18 +1115,16 @@ class FrrSimRuntime:
             f"{format(ip2.ip)}\t{sat_name}-TO-{station_name} {sat_name}-downlink"
         ]
         
-        # Update hosts file in each network namespace
-        for node in self.net.hosts:
-            if add:
-                # Add new entries
-                for entry in dns_entries:
-                    node.cmd(f'echo "{entry}" >> /etc/netns/{node.name}/hosts')
-                    node.cmd(f'echo "{entry}" >> /etc/hosts')
-            else:
-                # Remove entries
-                for entry in dns_entries:
-                    node.cmd(f'sed -i "/{entry}/d" /etc/netns/{node.name}/hosts')
-                    node.cmd(f'sed -i "/{entry}/d" /etc/hosts')
+        # Update the host's and each network namespace's hosts file. The nodes share
+        # the host's file system so the files are updated directly rather than
+        # running shell commands on every node. Files reached through more than
+        # one path are only updated once.
+        paths = {}
+        for path in ["/etc/hosts"] + [f"/etc/netns/{node.name}/hosts" for node in self.net.hosts]:
+            if os.path.exists(path):
+                paths.setdefault(os.path.realpath(path), path)
+        for path in paths.values():
+            update_hosts_file(path, dns_entries, add)
 
     def _create_uplink(
         self,
@@ -975,11 +1154,12 @@ class FrrSimRuntime:
         frr_router = self.routers[sat_name]
 
         # Configure static route and OSPF
-        frr_router.config_frr("staticd", [f"ip route {station.defaultIP()}/32 {format(ip1.ip)}"])
+        station_ip = station.defaultIP()
+        frr_router.config_frr("staticd", [f"ip route {station_ip}/32 {ip1.ip}"])
         ospf_commands = [
             "router ospf",
-            f"network {format(ip_nw)} area 0",
-            f"network {station.defaultIP()}/32 area 0",
+            f"network {ip_nw} area 0",
+            f"network {station_ip}/32 area 0",
             "exit"
         ]
         frr_router.config_frr("ospfd", ospf_commands)
@@ -990,8 +1170,7 @@ class FrrSimRuntime:
         # Add default route on station
         station_node = self.net.getNodeByName(station_name)
         if station_node is not None:
-            route = f"via {format(ip2.ip)}"
-            station_node.cmd(f'ip route add default {route}')
+            station_node.cmd(f'ip route add default via {ip2.ip}')
 
 
     def _remove_link(self, station_name: str, sat_name: str, ip_nw: ipaddress.IPv4Network, ip: ipaddress.IPv4Interface) -> None:
@@ -1013,11 +1192,7 @@ class FrrSimRuntime:
             return
             
         # Find the uplink if it exists
-        uplink = None
-        for u in station.uplinks:
-            if u.sat_name == sat_name:
-                uplink = u
-                break
+        uplink = station.uplinks.get(sat_name)
                 
         if uplink:
             self._update_dns_for_uplink(
@@ -1027,39 +1202,25 @@ class FrrSimRuntime:
                 uplink.ip_pool_entry.ip2, 
                 add=False
             )
-            
-            # Remove static route
-            frr_router = self.routers[sat_name]
-            frr_router.config_frr("staticd", [f"no ip route {station.defaultIP()}/32 {format(ip.ip)}"])
-            
-            # Remove the actual link
-            self.net.delLinkBetween(station_node, sat_node)
         else:
             print(f"Warning: No uplink found between {station_name} and {sat_name}")
 
-        
         # Remove static route
-        station = self.ground_stations[station_name]
         frr_router = self.routers[sat_name]
-        frr_router.config_frr("staticd", [f"no ip route {station.defaultIP()}/32 {format(ip.ip)}"])
+        frr_router.config_frr("staticd", [f"no ip route {station.defaultIP()}/32 {ip.ip}"])
+
+        # Remove the actual link
         self.net.delLinkBetween(station_node, sat_node)
 
     def _update_default_route(self, station: GroundStation) -> None:
-        closest_uplink = None
         # Find closest uplink
-        for uplink in station.uplinks:
-            if closest_uplink is None:
-                closest_uplink = uplink
-            elif closest_uplink.distance < uplink.distance:
-                closest_uplink = uplink
+        closest_uplink = min(station.uplinks.values(), key=lambda u: u.distance, default=None)
         
         # If the closest has changed, update the default route
         if closest_uplink is not None and not closest_uplink.default:
-            # Clear current default
-            for uplink in station.uplinks:
-                uplink.default = False
-            # Mark new default and set
-            closest_uplink.default = True 
+            # Mark new default and clear the old one
+            for uplink in station.uplinks.values():
+                uplink.default = uplink is closest_uplink
             station_node = self.net.getNodeByName(station.name)
             route = "via %s" % format(closest_uplink.ip_pool_entry.ip2.ip)
             print(f"set default route for {station.name} to {route}")
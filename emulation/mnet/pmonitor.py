@@ -6,7 +6,7 @@ test mode or as a monitoring process.
 
 Main Features:
     - SQLite-based tracking of network targets.
-    - Sampling network targets using `ping`.
+    - Sampling network targets using `fping`, or `ping` if fping is not installed.
     - Rotating target sampling to distribute load across nodes.
     - Monitoring status and logging responses.
 
@@ -19,35 +19,86 @@ Usage:
 
 Dependencies:
     - SQLite
-    - Mininet
     - Logging
 '''
 from typing import Tuple
 import os
+import re
 import sys
 import sqlite3
 import shutil
+import tempfile
 import time
 import subprocess
-import mininet.net
 import logging
 
 
-def open_db(file_path: str) -> sqlite3.Connection:
+SQL_IS_RUNNING = "SELECT running FROM targets WHERE address = ?"
+SQL_SET_RUNNING = "UPDATE targets SET running = ? WHERE address = ?"
+SQL_CAN_RUN = "SELECT run FROM targets WHERE address = ?"
+SQL_SET_CAN_RUN = "UPDATE targets SET run = ? WHERE address = ?"
+SQL_STATUS_COUNT = (
+    "SELECT COALESCE(SUM(responded = TRUE), 0), COALESCE(SUM(total_count > 0), 0) FROM targets"
+)
+SQL_STABLE_STATUS_COUNT = SQL_STATUS_COUNT + " WHERE stable = TRUE"
+SQL_LAST_FIVE = "SELECT name, responded FROM targets ORDER BY sample_time DESC LIMIT 5"
+SQL_STATUS_LIST = "SELECT name, responded FROM targets WHERE total_count > 0"
+SQL_TARGETS = "SELECT name, address, stable FROM targets"
+SQL_TARGET = "SELECT name, stable FROM targets WHERE address = ?"
+SQL_INSERT_TARGET = "INSERT INTO targets (name, address, stable) VALUES (?, ?, ?)"
+SQL_INSERT_ME = "INSERT INTO targets (name, address, stable, me) VALUES (?, ?, ?, TRUE)"
+SQL_UPSERT_SAMPLE = (
+    "INSERT INTO targets "
+    + "(name, address, sample_time, stable, responded, total_count, total_success) "
+    + "VALUES (?, ?, ?, ?, ?, ?, ?) "
+    + "ON CONFLICT(address) DO UPDATE SET "
+    + "responded = excluded.responded, "
+    + "sample_time = excluded.sample_time, "
+    + "total_count = total_count + 1, "
+    + "total_success = total_success + excluded.total_success "
+    + "WHERE excluded.responded OR targets.responded"
+)
+
+# fping output for a target: "10.0.0.1 : xmt/rcv/%loss = 1/1/0%, min/avg/max = ..."
+FPING_SUMMARY = re.compile(r"^(\S+)\s+: xmt/rcv/%loss = (\d+)/(\d+)/")
+
+
+def open_db(file_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
     '''
-Open a connection to an SQLite database.
+Open a connection to an SQLite database, configured with tune_db.
 
 Args:
     file_path (str): Path to the SQLite database file.
+    check_same_thread (bool): If False, the connection may be used from threads
+        other than the one that opened it. The caller must serialize access.
 
 Returns:
     sqlite3.Connection: A connection object to interact with the database.
 '''
     
-    db = sqlite3.connect(file_path)
+    db = sqlite3.connect(file_path, check_same_thread=check_same_thread)
+    tune_db(db)
     return db
 
 
+def tune_db(db: sqlite3.Connection):
+    '''
+Configure a connection to a database shared with other processes.
+
+The monitor processes write the databases while the controller and other
+monitors read them. WAL mode lets readers and the writer proceed without
+blocking each other, and relaxed syncing avoids an fsync per commit.
+
+Args:
+    db (sqlite3.Connection): Database connection.
+'''
+
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute("PRAGMA temp_store=MEMORY")
+    db.execute("PRAGMA cache_size=-4096")
+
+
 def create_db(file_path: str):
     '''
 Create a new SQLite database and initialize it with the schema.
@@ -82,10 +133,7 @@ Returns:
     bool: True if the target is running, False otherwise.
 '''
 
-    c = db.cursor()
-    q = c.execute("SELECT running FROM targets WHERE address = ?", (address,))
-    entry = q.fetchone()
-    return entry[0]
+    return db.execute(SQL_IS_RUNNING, (address,)).fetchone()[0]
 
 
 def set_running(db, address: str, running: bool):
@@ -98,14 +146,7 @@ Args:
     running (bool): Running status to set (True or False).
 '''
 
-    c = db.cursor()
-    q = c.execute(
-        "UPDATE targets SET running = ? WHERE address = ?",
-        (
-            running,
-            address,
-        ),
-    )
+    db.execute(SQL_SET_RUNNING, (running, address))
     db.commit()
 
 
@@ -121,10 +162,7 @@ Returns:
     bool: True if the target can be sampled, False otherwise.
 '''
 
-    c = db.cursor()
-    q = c.execute("SELECT run FROM targets WHERE address = ?", (address,))
-    entry = q.fetchone()
-    return entry[0]
+    return db.execute(SQL_CAN_RUN, (address,)).fetchone()[0]
 
 
 def set_can_run(db, address: str, can_run):
@@ -137,14 +175,7 @@ Args:
     can_run (bool): New value for the 'can_run' status.
 '''
 
-    c = db.cursor()
-    q = c.execute(
-        "UPDATE targets SET run = ? WHERE address = ?",
-        (
-            can_run,
-            address,
-        ),
-    )
+    db.execute(SQL_SET_CAN_RUN, (can_run, address))
     db.commit()
 
 
@@ -160,19 +191,9 @@ Returns:
     tuple[int, int]: A tuple containing the count of responding targets and total targets.
 '''
 
-    c = db.cursor()
     # May sample only stable node connections or all
-    if stable:
-        q = c.execute("SELECT COUNT(*) FROM targets WHERE stable = TRUE AND responded = TRUE")
-        good_targets = q.fetchone()[0]
-        q = c.execute("SELECT COUNT(*) FROM targets WHERE stable = TRUE AND total_count > 0")
-        total_targets = q.fetchone()[0]
-    else:
-        q = c.execute("SELECT COUNT(*) FROM targets WHERE responded = TRUE")
-        good_targets = q.fetchone()[0]
-        q = c.execute("SELECT COUNT(*) FROM targets WHERE total_count > 0")
-        total_targets = q.fetchone()[0]
-    c.close()
+    q = db.execute(SQL_STABLE_STATUS_COUNT if stable else SQL_STATUS_COUNT)
+    good_targets, total_targets = q.fetchone()
     return good_targets, total_targets
 
 def get_last_five(db) ->list[tuple[str,bool]]:
@@ -186,12 +207,7 @@ Returns:
     list[tuple[str, bool]]: List of tuples with target names and response status.
 '''
 
-    c = db.cursor()
-    q = c.execute("SELECT name, responded FROM targets ORDER BY sample_time DESC LIMIT 5")
-    result = []
-    for name, responded in q.fetchall():
-        result.append((name, responded))
-    return result
+    return db.execute(SQL_LAST_FIVE).fetchall()
 
 def get_status_list(db) -> dict[str, bool]:
     '''
@@ -204,12 +220,7 @@ Returns:
     dict[str, bool]: A dictionary mapping target names to their response status.
 '''
 
-    c = db.cursor()
-    q = c.execute("SELECT name, responded FROM targets WHERE total_count > 0")
-    result = {}
-    for e in q.fetchall():
-        result[e[0]] = e[1]
-    return result
+    return dict(db.execute(SQL_STATUS_LIST).fetchall())
 
 
 TEST = False
@@ -229,49 +240,82 @@ Args:
 Logs:
     - Ping results and process output.
     - Database updates for target status.
+
+The update is not committed, the caller commits once per round of samples.
+Used when fping is not available, otherwise see probe_targets.
 '''
 
     logging.info("sample target: %s", address)
     process = subprocess.run(
-        ["ping", "-I", src_address, "-c1", "-W3", f"{address}"], capture_output=True, text=True
+        ["ping", "-q", "-I", src_address, "-c1", "-W3", f"{address}"], capture_output=True, text=True
     )
     logging.info("%s", process.stdout)
-    sent, received = mininet.net.Mininet._parsePing(process.stdout)
-    result = sent == received
+    # ping exits with 0 only when a reply was received
+    record_sample(db, name, address, stable, process.returncode == 0)
+
+
+def probe_targets(addresses: list[str], src_address: str) -> dict[str, bool]:
+    '''
+Ping all addresses at once with a single fping process.
+
+Args:
+    addresses (list[str]): IP addresses of the targets.
+    src_address (str): Source IP address to use for the pings.
+
+Returns:
+    dict[str, bool]: Map of address to whether it responded. Addresses missing
+        from the fping output are reported as not responding.
+'''
 
-    prev_responded = False
+    logging.info("probe targets: %s", addresses)
+    process = subprocess.run(
+        ["fping", "-q", "-c1", "-t3000", "-S", src_address] + addresses, capture_output=True, text=True
+    )
+    # fping writes the per target summary to stderr
+    logging.info("%s", process.stderr)
+    return parse_fping_summary(process.stderr, addresses)
+
+
+def parse_fping_summary(output: str, addresses: list[str]) -> dict[str, bool]:
+    '''
+Find which targets responded from the summary fping -q writes to stderr.
+
+Args:
+    output (str): The fping summary, one line per target.
+    addresses (list[str]): IP addresses of the targets.
+
+Returns:
+    dict[str, bool]: Map of address to whether it responded. Addresses missing
+        from the output are reported as not responding.
+'''
+
+    results = {address: False for address in addresses}
+    for line in output.splitlines():
+        m = FPING_SUMMARY.match(line)
+        if m is not None and m.group(1) in results:
+            sent, received = int(m.group(2)), int(m.group(3))
+            results[m.group(1)] = sent > 0 and sent == received
+    return results
+
+
+def record_sample(db, name: str, address: str, stable: bool, result: bool):
+    '''
+Update the database with the result of sampling a target.
+
+Args:
+    db (sqlite3.Connection): Database connection.
+    name (str): Name of the target.
+    address (str): IP address of the target.
+    stable (bool): Whether the target is stable.
+    result (bool): True if the target responded.
+
+The update is not committed, the caller commits once per round of samples.
+'''
+
+    # Targets only start counting once they have responded. Until then a failed
+    # sample just records the row, so the update is skipped.
     now = time.time()
-    c = db.cursor()
-    q = c.execute("SELECT responded FROM targets WHERE address = ?", (address,))
-    qr = q.fetchall()
-    if len(qr) == 0:
-        c.execute("INSERT INTO targets (name, address, sample_time, stable) VALUES (?, ?, ?, ?)", (name, address, now, stable))
-    else:
-        prev_responded = qr[0][0]
-
-    if result:
-        c.execute(
-            "UPDATE targets SET responded = TRUE, "
-            + "sample_time = ?,"
-            + "total_count = total_count + 1, "
-            + "total_success = total_success + 1 "
-            + "WHERE address = ?",
-            (
-                now,
-                address,
-            ),
-        )
-    elif prev_responded:
-        c.execute(
-            "UPDATE targets SET responded = FALSE, "
-            + "sample_time = ?,"
-            + "total_count = total_count + 1 WHERE address = ?",
-            (
-                now,
-                address,
-            ),
-        )
-    db.commit()
+    db.execute(SQL_UPSERT_SAMPLE, (name, address, now, stable, result, int(result), int(result)))
 
 
 def monitor_targets(db_path_master: str, db_path_local: str, address: str):
@@ -293,23 +337,15 @@ Raises:
     db_local = open_db(db_path_local)
 
     # Make an entry for the current monitoring process
-    c = db_master.cursor()
-    q = c.execute("SELECT name, stable FROM targets WHERE address = ?", (address,))
-    name, stable = q.fetchone()
-    c.close()
-    c = db_local.cursor()
-    c.execute("INSERT INTO targets (name, address, stable, me) VALUES (?, ?, ?, TRUE)", (name,address,stable))
+    name, stable = db_master.execute(SQL_TARGET, (address,)).fetchone()
+    db_local.execute(SQL_INSERT_ME, (name, address, stable))
     db_local.commit()
-    c.close()
 
+    use_fping = shutil.which("fping") is not None
     running = True
     while running:
-        targets = []
         logging.info("reload target list")
-        c = db_master.cursor()
-        q = c.execute("SELECT name, address, stable FROM targets")
-        for entry in q.fetchall():
-            targets.append(entry)
+        targets = db_master.execute(SQL_TARGETS).fetchall()
 
         index = -1
         for i in range(len(targets)):
@@ -323,46 +359,57 @@ Raises:
             tmp.extend(targets[:index])
             targets = tmp
 
-        for target in targets:
+        if use_fping:
+            # Probe every target in one pass
             if not TEST:
                 time.sleep(5)
             running = can_run(db_master, address)
-            if running:
+            if running and len(targets) > 0:
+                results = probe_targets([target[1] for target in targets], address)
+                for target in targets:
+                    record_sample(db_local, target[0], target[1], target[2], results[target[1]])
+        else:
+            for target in targets:
+                if not TEST:
+                    time.sleep(5)
+                # Stop as soon as the monitor is told to, rather than finishing the round
+                running = can_run(db_master, address)
+                if not running:
+                    break
                 sample_target(db_local, target[0], target[1], target[2], address)
+        db_local.commit()
         if TEST:
             set_can_run(db_master, address, False)
-        running = can_run(db_master, address)
+        if running:
+            running = can_run(db_master, address)
+    db_local.close()
+    db_master.close()
 
 
-def init_targets(db_file_path: str, data: list[tuple[str,str,bool]]):
+def init_targets(db_file_path: str, data: list[tuple[str,str,bool]], db: sqlite3.Connection = None):
     '''
 Initialize the targets table in the database with the provided data.
 
 Args:
     db_file_path (str): Path to the SQLite database file.
     data (list[tuple[str, str, bool]]): List of target tuples (name, address, stable).
+    db (sqlite3.Connection): Optional open connection to the database to reuse.
 
 Creates:
     - A clean database with the specified target entries.
 '''
 
+    # Recreates an empty targets table
     create_db(db_file_path)
 
-    db = open_db(db_file_path)
-    c = db.cursor()
-    q = c.execute("DELETE FROM targets")
-    db.commit()
-
-    for entry in data:
-        target = entry[0]
-        address = entry[1]
-        stable = entry[2]
-
-        c.execute(
-            "INSERT INTO targets (name, address, stable) VALUES (?, ?, ?)", (target, address, stable)
-        )
-    db.commit()
-    db.close()
+    close = db is None
+    if close:
+        db = open_db(db_file_path)
+    # Insert all targets in a single transaction
+    with db:
+        db.executemany(SQL_INSERT_TARGET, data)
+    if close:
+        db.close()
 
 
 def test() -> bool:
@@ -384,28 +431,40 @@ Logs:
         ("host3", "192.168.55.2", True),
         ("host3", "192.168.55.3", False),
     ]
-    db_master = "master.sqlite"
-    db_working = "work.sqlite"
-
-    init_targets(db_master, data)
-    global TEST
-    TEST = True
-    set_running(open_db(db_master), data[1][1], True)
-    monitor_targets(db_master, db_working, data[0][1])
-    monitor_targets(db_master, db_working, data[3][1])
-    good, total = get_status_count(open_db(db_working))
-    results = get_status_list(open_db(db_working))
-    results = get_last_five(open_db(db_working))
+    # Keep the test databases out of the working directory
+    with tempfile.TemporaryDirectory() as db_dir:
+        db_master = os.path.join(db_dir, "master.sqlite")
+        db_working = os.path.join(db_dir, "work.sqlite")
+
+        init_targets(db_master, data)
+        global TEST
+        TEST = True
+        master = open_db(db_master)
+        set_running(master, data[1][1], True)
+        master.close()
+        monitor_targets(db_master, db_working, data[0][1])
+        monitor_targets(db_master, db_working, data[3][1])
+        working = open_db(db_working)
+        good, total = get_status_count(working, False)
+        results = get_status_list(working)
+        results = get_last_five(working)
+        working.close()
     print(f"status {good} / {total}")
     return True
 
 def consolidate_databases(master_db: str, working_dbs: list[str], output_path: str):
     """
     Consolidate master and working databases into a single analysis database
+
+    The databases are attached in turn to a single connection. The output is a
+    new file of no use if consolidation fails, so it is written without a
+    journal or syncing.
     """
     # Create new consolidated database
     create_db(output_path)
     output_db = sqlite3.connect(output_path)
+    output_db.execute("PRAGMA journal_mode=OFF")
+    output_db.execute("PRAGMA synchronous=OFF")
     
     # Add simulation metadata table
     output_db.execute('''
@@ -430,15 +489,21 @@ def consolidate_databases(master_db: str, working_dbs: list[str], output_path: s
     ''')
     
     # Copy master database target information
-    master = sqlite3.connect(master_db)
+    # The schema has already created the targets table
     output_db.execute("ATTACH DATABASE ? AS master", (master_db,))
-    output_db.execute("CREATE TABLE targets AS SELECT * FROM master.targets")
+    output_db.execute("INSERT INTO targets SELECT * FROM master.targets")
+    # SQLite will not detach a database inside a transaction
+    output_db.commit()
     output_db.execute("DETACH master")
     
     # Consolidate working databases
     for working_db in working_dbs:
         try:
             output_db.execute("ATTACH DATABASE ? AS working", (working_db,))
+        except sqlite3.Error as e:
+            print(f"Error processing {working_db}: {e}")
+            continue
+        try:
             node_name = output_db.execute("SELECT name FROM working.targets WHERE me = TRUE").fetchone()
             if node_name:
                 output_db.execute("""
@@ -447,9 +512,11 @@ def consolidate_databases(master_db: str, working_dbs: list[str], output_path: s
                     FROM working.targets
                     WHERE me = FALSE
                 """, (node_name[0],))
-            output_db.execute("DETACH working")
+            output_db.commit()
         except sqlite3.Error as e:
+            output_db.rollback()
             print(f"Error processing {working_db}: {e}")
+        output_db.execute("DETACH working")
     
     # Add indexes for efficient querying
     output_db.execute("CREATE INDEX idx_node_history_time ON node_history(sample_time)")
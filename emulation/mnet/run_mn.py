@@ -4,10 +4,14 @@ Run a mininet instance of FRR routers in a torus topology with namespace-aware t
 Includes improved cleanup and process management.
 '''
 
+import atexit
 import configparser
+import faulthandler
+import glob
 import signal
 import sys
 import os
+import shutil
 from pathlib import Path
 import subprocess
 import time
@@ -30,6 +34,107 @@ frrt = None
 webpack_process = None
 enable_monitoring = False
 cleanup_in_progress = False
+# Process ids of the tcpdump captures started by setup_packet_capture
+capture_pids = []
+# Nodes and interfaces with packets mirrored to a capture interface
+capture_mirrors = []
+
+# Hosts and resolv.conf files shared by all node namespaces
+NETNS_SHARED_DIR = "/etc/netns/common"
+
+# Leftover FRR daemons from a previous run, matched against the full command line
+FRR_DAEMONS = "watchfrr|zebra|ospfd|staticd"
+# Remove namespaces and veth links from a previous run. The veth links are
+# deleted in one "ip -batch" call. The daemons are killed by a separate pkill,
+# as pkill -f would match the shell running this script if it held the pattern.
+# The two steps do not depend on each other, so they run in the background
+# together and the script waits for both.
+CLEANUP_SCRIPT = " &\n".join([
+    'ip -all netns delete 2>/dev/null',
+    'ip -o link show'
+    ' | awk -F\': \' \'$2 ~ /veth/ { split($2, name, "@"); print "link delete " name[1] }\''
+    ' | ip -force -batch - 2>/dev/null',
+]) + " &\nwait"
+# FRR files left in /tmp, removed from Python so no command line holds the names
+FRR_TMP_FILES = ['/tmp/frr.*', '/tmp/zebra.*', '/tmp/ospfd.*']
+
+# Packets recorded by the per node captures
+CAPTURE_FILTER = "ip proto ospf or icmp or tcp or udp"
+CAPTURE_FILTER_FILE = "/tmp/capture_filter.bpf"
+# Dummy interface in each satellite that receives the mirrored packets, and
+# the IP protocols mirrored to it: OSPF, ICMP, TCP and UDP
+CAPTURE_INTF = "capmon"
+CAPTURE_PROTOCOLS = (89, 1, 6, 17)
+# Used to merge the captures, required when monitoring
+MERGECAP = shutil.which('mergecap')
+
+# Host files replaced while the network runs and where they are backed up
+BACKUPS = [
+    ('/etc/hosts', '/etc/hosts.mininet.bak'),
+    ('/etc/resolv.conf', '/etc/resolv.conf.mininet.bak'),
+]
+
+
+def backup_host_files():
+    '''
+    Save copies of the host files that configure_dns overwrites.
+    '''
+    for path, backup in BACKUPS:
+        if os.path.exists(path):
+            shutil.copy2(path, backup)
+
+
+def restore_host_files():
+    '''
+    Restore the host files saved by backup_host_files.
+
+    The contents are copied back rather than renamed over the originals, as
+    they may be symlinks or bind mounts (e.g. in a container).
+    '''
+    for path, backup in BACKUPS:
+        if os.path.exists(backup):
+            shutil.copyfile(backup, path)
+            os.unlink(backup)
+            print(f"Restored {path}.")
+
+
+def remove_paths(patterns):
+    '''
+    Remove the files and directories matching the glob patterns.
+    '''
+    for pattern in patterns:
+        for path in glob.glob(pattern):
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+
+def cleanup_frr_state(daemons=FRR_DAEMONS, script=CLEANUP_SCRIPT, tmp_files=FRR_TMP_FILES):
+    '''
+    Kill leftover FRR daemons and remove namespaces, veth links and FRR files.
+    '''
+    # pkill runs directly, not from a shell whose command line could match.
+    # The steps are independent, so the daemons are killed while the links
+    # and files are removed.
+    pkill = subprocess.Popen(['pkill', '-f', daemons])
+    subprocess.run(['sh', '-c', script], check=False)
+    remove_paths(tmp_files)
+    pkill.wait()
+
+
+def netns_or_veth_left() -> bool:
+    '''
+    Check for network namespaces or veth links that CLEANUP_SCRIPT did not remove.
+    Links are matched by name, as in the script.
+    '''
+    netns = subprocess.run(['ip', 'netns', 'list'], capture_output=True, text=True).stdout
+    links = subprocess.run(['ip', '-o', 'link', 'show'], capture_output=True, text=True).stdout
+    return netns.strip() != "" or any(
+        'veth' in line.split(': ')[1] for line in links.splitlines() if line.count(': ') >= 2)
 
 
 def ensure_clean_state():
@@ -37,66 +142,108 @@ def ensure_clean_state():
     Ensure clean state before starting a new instance.
     """
     print("Ensuring clean state before starting...")
-    os.system('pkill -f "watchfrr|zebra|ospfd|staticd"')
-    os.system('ip -all netns delete')
-    os.system('ip link show | grep veth | cut -d"@" -f1 | while read veth; do ip link delete $veth 2>/dev/null; done')
-    os.system('rm -rf /tmp/frr.* /tmp/zebra.* /tmp/ospfd.*')
-    time.sleep(2)
+    cleanup_frr_state()
+    if netns_or_veth_left():
+        print("Warning: namespaces or veth links from a previous run remain.")
+    # Give the killed FRR daemons time to exit
+    if not wait_until(lambda: subprocess.run(['pgrep', '-f', FRR_DAEMONS],
+                                             stdout=subprocess.DEVNULL).returncode != 0, 2):
+        print("Warning: FRR daemons from a previous run are still running.")
 
 
-def configure_dns(net, graph):
+def wait_until(condition, timeout, interval=0.02):
+    '''
+    Poll condition until it returns True or timeout seconds have passed.
+    Returns the last result of condition.
+    '''
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+
+def frr_ready(frrt):
+    '''
+    Check whether every router's FRR daemons have created their vty sockets.
+    '''
+    for router in frrt.routers.values():
+        for daemon in ("zebra", "ospfd", "staticd"):
+            if not os.path.exists(frr_topo.FrrRouter.VTY_DIR.format(node=router.name, daemon=daemon)):
+                return False
+    return True
+
+
+def configure_dns(net, graph, satellites, ground_stations):
     '''
     Configure DNS for all nodes in the network by updating /etc/hosts
     in each node's namespace.
+
+    The satellite and ground station names are passed in so the graph
+    is not searched for them again.
     '''
-    hosts_entries = set()  # Use a set to avoid duplicates
+    # Host names for each IP address. Each address gets a single line.
+    hosts_entries: dict[str, list[str]] = {}
+
+    def add_entry(ip, *names):
+        entry = hosts_entries.setdefault(format(ip.ip), [])
+        for name in names:
+            if name not in entry:
+                entry.append(name)
 
     # Satellites
-    for name in torus_topo.satellites(graph):
+    for name in satellites:
         node = graph.nodes[name]
         if "ip" in node:
-            hosts_entries.add(f"{format(node['ip'].ip)}\t{name}")
-
-        for neighbor in graph.adj[name]:
-            edge = graph.adj[name][neighbor]
-            local_ip = edge["ip"][name]
-            remote_ip = edge["ip"][neighbor]
-            local_intf = edge["intf"][name]
-            remote_intf = edge["intf"][neighbor]
+            add_entry(node['ip'], name)
 
-            hosts_entries.add(f"{format(local_ip.ip)}\t{local_intf} {name}-TO-{neighbor}")
-            hosts_entries.add(f"{format(remote_ip.ip)}\t{remote_intf} {neighbor}-TO-{name}")
+    # Both ends of each satellite link in a single walk of the edges
+    satellites = set(satellites)
+    for node1, node2, edge in graph.edges(data=True):
+        for local, remote in ((node1, node2), (node2, node1)):
+            if local in satellites:
+                add_entry(edge["ip"][local], edge["intf"][local], f"{local}-TO-{remote}")
 
     # Ground stations
-    for name in torus_topo.ground_stations(graph):
+    for name in ground_stations:
         node = graph.nodes[name]
         if "ip" in node:
-            hosts_entries.add(f"{format(node['ip'].ip)}\t{name}")
-
-    hosts_content = "\n".join([
-        "127.0.0.1\tlocalhost",
-        "::1\tlocalhost ip6-localhost ip6-loopback",
-        "fe00::0\tip6-localnet",
-        "ff00::0\tip6-mcastprefix",
-        "ff02::1\tip6-allnodes",
-        "ff02::2\tip6-allrouters",
-        "\n# Network hosts",
-        *sorted(hosts_entries)
-    ])
+            add_entry(node['ip'], name)
+
+    hosts_header = (
+        "127.0.0.1\tlocalhost\n"
+        "::1\tlocalhost ip6-localhost ip6-loopback\n"
+        "fe00::0\tip6-localnet\n"
+        "ff00::0\tip6-mcastprefix\n"
+        "ff02::1\tip6-allnodes\n"
+        "ff02::2\tip6-allrouters\n"
+        "\n# Network hosts\n"
+    )
+    resolv_content = "nameserver 127.0.0.1\nsearch mininet\n"
+
+    # Write the files once to a shared directory and copy them to the host's
+    # /etc, then link each node's namespace files to the shared copies.
+    os.makedirs(NETNS_SHARED_DIR, exist_ok=True)
+    hosts_path = os.path.join(NETNS_SHARED_DIR, "hosts")
+    with open(hosts_path, 'w') as f:
+        f.write(hosts_header)
+        # Entries keep the graph's order, there is no need to sort them
+        f.writelines(f"{ip}\t{' '.join(names)}\n" for ip, names in hosts_entries.items())
+    resolv_path = os.path.join(NETNS_SHARED_DIR, "resolv.conf")
+    with open(resolv_path, 'w') as f:
+        f.write(resolv_content)
+    shutil.copyfile(hosts_path, '/etc/hosts')
+    shutil.copyfile(resolv_path, '/etc/resolv.conf')
 
     for node in net.hosts:
-        temp_file = f'/tmp/hosts_{node.name}.temp'
-        with open(temp_file, 'w') as f:
-            f.write(hosts_content)
-
-        node.cmd(f'mkdir -p /etc/netns/{node.name}')
-        node.cmd(f'cp {temp_file} /etc/netns/{node.name}/hosts')
-        node.cmd(f'cp {temp_file} /etc/hosts')
-        node.cmd(f'rm {temp_file}')
-
-        resolv_content = "nameserver 127.0.0.1\nsearch mininet"
-        node.cmd(f'echo "{resolv_content}" > /etc/netns/{node.name}/resolv.conf')
-        node.cmd(f'echo "{resolv_content}" > /etc/resolv.conf')
+        netns_dir = f'/etc/netns/{node.name}'
+        os.makedirs(netns_dir, exist_ok=True)
+        for file_name in ("hosts", "resolv.conf"):
+            link = os.path.join(netns_dir, file_name)
+            if os.path.lexists(link):
+                os.unlink(link)
+            os.symlink(os.path.join(NETNS_SHARED_DIR, file_name), link)
 
 
 def cleanup_dns(net):
@@ -104,65 +251,115 @@ def cleanup_dns(net):
     Clean up DNS configuration when the network is stopped.
     '''
     try:
+        # The nodes share the host filesystem, so remove the directories directly
+        # rather than with a command in each node.
         for node in net.hosts:
-            node.cmd(f'rm -rf /etc/netns/{node.name}')
-            print(f"Removed /etc/netns/{node.name}.")
-
-        if os.path.exists('/etc/hosts.mininet.bak'):
-            os.system('cp /etc/hosts.mininet.bak /etc/hosts')
-            os.system('rm /etc/hosts.mininet.bak')
-            print("Restored /etc/hosts.")
-
-        if os.path.exists('/etc/resolv.conf.mininet.bak'):
-            os.system('cp /etc/resolv.conf.mininet.bak /etc/resolv.conf')
-            os.system('rm /etc/resolv.conf.mininet.bak')
-            print("Restored /etc/resolv.conf.")
+            shutil.rmtree(f'/etc/netns/{node.name}', ignore_errors=True)
+        print(f"Removed /etc/netns for {len(net.hosts)} nodes.")
+        shutil.rmtree(NETNS_SHARED_DIR, ignore_errors=True)
+        restore_host_files()
     except Exception as e:
         print(f"Error during DNS cleanup: {e}")
 
 
-def setup_packet_capture(net, graph, capture_dir):
+def mirror_commands(intfs):
+    '''
+    Commands that add the capture interface and mirror packets of the
+    captured protocols, in both directions, from each interface to it.
+    Packets of other protocols are never copied.
+    '''
+    commands = [
+        f'ip link add {CAPTURE_INTF} type dummy',
+        f'ip link set {CAPTURE_INTF} up',
+    ]
+    for intf in intfs:
+        commands.append(f'tc qdisc add dev {intf} clsact')
+        for direction in ("ingress", "egress"):
+            for protocol in CAPTURE_PROTOCOLS:
+                commands.append(
+                    f'tc filter add dev {intf} {direction} protocol ip '
+                    f'u32 match ip protocol {protocol} 0xff '
+                    f'action mirred egress mirror dev {CAPTURE_INTF}')
+    return [f'{command} 2>/dev/null' for command in commands]
+
+
+def remove_capture_mirrors():
+    '''
+    Remove the mirroring qdiscs and capture interfaces added by
+    setup_packet_capture.
+    '''
+    for node, intfs in capture_mirrors:
+        commands = [f'tc qdisc del dev {intf} clsact' for intf in intfs]
+        commands.append(f'ip link del {CAPTURE_INTF}')
+        node.sendCmd("; ".join(f'{command} 2>/dev/null' for command in commands))
+    for node, _ in capture_mirrors:
+        node.waitOutput()
+    capture_mirrors.clear()
+
+
+def setup_packet_capture(net, node_names, satellites, capture_dir):
     """
     Set up packet capture within each router's network namespace.
     """
     print(f"\nSetting up packet capture in: {capture_dir}")
 
-    # Ensure we have permission to write to the directory
-    os.system(f'chmod -R 777 {capture_dir}')
+    # Ensure we have permission to write to the directory. Only the directory
+    # itself is changed, keeping any sticky bit, as it may be /tmp.
+    os.chmod(capture_dir, os.stat(capture_dir).st_mode | 0o777)
 
     # Kill any existing tcpdump processes
-    os.system('pkill -f tcpdump')
+    subprocess.run(['pkill', '-f', 'tcpdump'], check=False)
+
+    # Write the capture filter once and have every tcpdump read it from the file.
+    # The nodes share the host filesystem.
+    with open(CAPTURE_FILTER_FILE, 'w') as f:
+        f.write(CAPTURE_FILTER + '\n')
 
     # Create the tcpdump command template
-    # Using -B 4096 to increase buffer size and help prevent packet drops
+    # Using -B 4096 to increase buffer size and help prevent packet drops.
     tcpdump_cmd = (
-        'tcpdump -i any -s 0 -n -B 4096 -w /tmp/capture_{}.pcap '
-        '"ip proto ospf or icmp or tcp or udp" '
+        'tcpdump -i {intf} -s 0 -n -B 4096 -w /tmp/capture_{name}.pcap '
+        f'-F {CAPTURE_FILTER_FILE} '
         '2>/dev/null &'
     )
 
-    # Start capture for each satellite
-    for node_name in torus_topo.satellites(graph):
-        if node_name in net:
-            node = net.get(node_name)
-            node.cmd(tcpdump_cmd.format(node_name))
-            print(f"Started capture for {node_name}")
-
-    # Start capture for ground stations
-    for node_name in torus_topo.ground_stations(graph):
+    # Start capture for each satellite and ground station. Send the commands to
+    # all nodes first and then wait for them, so the shells run in parallel.
+    # Satellites mirror the wanted packets from their links to a dummy interface
+    # and capture only that. Ground stations capture on "any" as their uplinks
+    # are added and removed while the network runs.
+    capture_nodes = []
+    for node_name in node_names:
+        # Files left from an earlier run would look like a started capture
+        if os.path.exists(f'/tmp/capture_{node_name}.pcap'):
+            os.unlink(f'/tmp/capture_{node_name}.pcap')
         if node_name in net:
             node = net.get(node_name)
-            node.cmd(tcpdump_cmd.format(node_name))
-            print(f"Started capture for {node_name}")
-
-    # Give tcpdump a moment to start
-    time.sleep(2)
-
-    # Verify captures are running
+            if node_name in satellites:
+                intfs = node.intfNames()
+                commands = mirror_commands(intfs)
+                commands.append(tcpdump_cmd.format(intf=CAPTURE_INTF, name=node_name))
+                node.sendCmd("; ".join(commands))
+                capture_mirrors.append((node, intfs))
+            else:
+                node.sendCmd(tcpdump_cmd.format(intf="any", name=node_name))
+            capture_nodes.append(node)
+    for node in capture_nodes:
+        node.waitOutput()
+        # Mininet records the pid of a backgrounded command
+        if node.lastPid is not None:
+            capture_pids.append(node.lastPid)
+        print(f"Started capture for {node.name}")
+
+    # tcpdump creates its capture file once it is capturing
+    capture_files = [f'/tmp/capture_{node.name}.pcap' for node in capture_nodes]
+    wait_until(lambda: all(os.path.exists(path) for path in capture_files), 2)
+
+    # Verify captures are running. The nodes share the host's process table,
+    # so the recorded pids are checked directly without listing processes.
     running = False
-    for node in net.hosts:
-        result = node.cmd('ps aux | grep tcpdump')
-        if 'tcpdump -i any' in result:
+    for node in capture_nodes:
+        if node.lastPid is not None and pid_running(node.lastPid):
             running = True
             print(f"Confirmed capture running on {node.name}")
 
@@ -172,12 +369,37 @@ def setup_packet_capture(net, graph, capture_dir):
         print("\nWarning: Packet captures may not have started properly.")
 
 
+def pid_running(pid):
+    '''
+    Check whether a process exists.
+    '''
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
 def stop_packet_capture():
     '''
     Stop all running tcpdump processes.
     '''
-    os.system('pkill -f tcpdump')
-    time.sleep(1)
+    if capture_pids:
+        for pid in capture_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        # Wait for tcpdump to flush and close its capture file
+        wait_until(lambda: not any(pid_running(pid) for pid in capture_pids), 1)
+        capture_pids.clear()
+    else:
+        # Captures were not tracked, fall back to matching by name
+        subprocess.run(['pkill', '-f', 'tcpdump'], check=False)
+        wait_until(lambda: subprocess.run(['pgrep', '-f', 'tcpdump'],
+                                          stdout=subprocess.DEVNULL).returncode != 0, 1)
+    if os.path.exists(CAPTURE_FILTER_FILE):
+        os.unlink(CAPTURE_FILTER_FILE)
     print("Stopped all tcpdump processes.")
 
 
@@ -191,18 +413,16 @@ def merge_captures(save_dir):
     capture_files = list(Path('/tmp').glob('capture_*.pcap'))
 
     if capture_files:
-        # Prefer mergecap if available, otherwise fall back to cat
-        if os.system('which mergecap >/dev/null 2>&1') == 0:
-            cmd = f'mergecap -w {output_file} /tmp/capture_*.pcap'
-        else:
-            cmd = f'cat /tmp/capture_*.pcap > {output_file}'
-
-        os.system(cmd)
+        # mergecap writes a single valid pcap, it is checked for at startup
+        result = subprocess.run([MERGECAP, '-w', output_file, *map(str, sorted(capture_files))], check=False)
+        if result.returncode != 0:
+            print("\nmergecap failed, leaving captures in /tmp")
+            return
         print(f"\nMerged captures into {output_file}")
 
         # Clean up individual capture files
         for file in capture_files:
-            os.unlink(file)
+            file.unlink(missing_ok=True)
 
 
 def cleanup_network():
@@ -211,6 +431,7 @@ def cleanup_network():
     '''
     global net, frrt, cleanup_in_progress, enable_monitoring
 
+    # Only clean up once, this is called from several exit paths
     if cleanup_in_progress:
         return
     cleanup_in_progress = True
@@ -230,10 +451,7 @@ def cleanup_network():
             if enable_monitoring:
                 # Consolidate monitoring databases
                 try:
-                    working_dbs = []
-                    for node in frrt.nodes.values():
-                        if os.path.exists(node.working_db):
-                            working_dbs.append(node.working_db)
+                    working_dbs = [path for path in frrt.working_dbs if os.path.exists(path)]
 
                     consolidated_db = os.path.join(save_dir, 'monitoring.sqlite')
                     consolidate_databases(frrt.db_file, working_dbs, consolidated_db)
@@ -245,6 +463,7 @@ def cleanup_network():
         if enable_monitoring:
             print("Stopping packet capture...")
             stop_packet_capture()
+            remove_capture_mirrors()
             try:
                 merge_captures(save_dir)
             except Exception as e:
@@ -261,14 +480,10 @@ def cleanup_network():
 
         # Final system-level cleanup
         print("Performing final cleanup...")
-        os.system('pkill -f "watchfrr|zebra|ospfd|staticd" 2>/dev/null')
-        os.system('ip -all netns delete 2>/dev/null')
-        os.system('rm -rf /tmp/frr.* /tmp/zebra.* /tmp/ospfd.*')
+        cleanup_frr_state()
 
     except Exception as e:
         print(f"Error during cleanup: {e}")
-    finally:
-        cleanup_in_progress = False
 
 
 def cleanup_webpack():
@@ -291,59 +506,67 @@ def signal_handler(sig, frame):
     Handle Ctrl+C for clean shutdown.
     '''
     print("\nCtrl-C received, shutting down...")
-    cleanup_network()
-    cleanup_webpack()
+    # Cleanup runs from the atexit handlers
     sys.exit(0)
 
 
 def run(num_rings, num_routers, use_cli, use_mnet, stable_monitors,
-        ground_stations, enable_mon, ground_station_data):
+        ground_stations, enable_mon, ground_station_data, use_terms=False,
+        vessel_data=None):
     '''
     Execute the simulation of an FRR router network.
     '''
     global net, frrt, enable_monitoring
     enable_monitoring = enable_mon  # Ensure global sees the correct flag
 
+    # Captures are merged with mergecap, fail before building the network
+    if enable_monitoring and use_mnet and MERGECAP is None:
+        print("Monitoring needs mergecap, install wireshark-common")
+        sys.exit(1)
+
+    # Clean up once on any exit: normal return, sys.exit or Ctrl+C.
+    # atexit runs the handlers in reverse, so the network goes first.
+    atexit.register(cleanup_webpack)
+    atexit.register(cleanup_network)
+
     try:
         ensure_clean_state()
 
         # Build the network
         graph = torus_topo.create_network(num_rings, num_routers,
-                                          ground_stations, ground_station_data)
+                                          ground_stations, ground_station_data,
+                                          vessel_data)
         frr_config_topo.annotate_graph(graph)
         topo = frr_topo.NetxTopo(graph)
 
         # Start Mininet
         if use_mnet:
             # Backup host DNS
-            if os.path.exists('/etc/hosts'):
-                os.system('cp /etc/hosts /etc/hosts.mininet.bak')
-            if os.path.exists('/etc/resolv.conf'):
-                os.system('cp /etc/resolv.conf /etc/resolv.conf.mininet.bak')
+            backup_host_files()
 
             net = Mininet(topo=topo)
             net.start()
-            configure_dns(net, graph)
+            configure_dns(net, graph, topo.satellite_names, topo.ground_station_names)
 
             if enable_monitoring:
-                # Let the network stabilize for a moment
-                time.sleep(2)
                 # Start packet captures
                 # (capture directory is created in cleanup, so we just run captures here)
-                setup_packet_capture(net, graph, "/tmp")  # or a subdir if you prefer
+                setup_packet_capture(net, topo.satellite_names + topo.ground_station_names,
+                                     set(topo.satellite_names), "/tmp")  # or a subdir if you prefer
 
         # Start FRR
         frrt = frr_topo.FrrSimRuntime(topo, net, stable_monitors)
         print("Starting FRR routers...")
         frrt.start_routers()
-        time.sleep(2)
+        if net is not None and not wait_until(lambda: frr_ready(frrt), 10, 0.1):
+            print("Warning: not all FRR daemons have started.")
 
-        # Optionally open terminals
-        if net is not None:
+        # Optionally open terminals. makeTerm starts xterm without waiting for it.
+        if use_terms and net is not None:
             nodes_to_open = ['G_LON', 'R0_0']
             for node_name in nodes_to_open:
-                node = net.get(node_name)
-                if node:
+                if node_name in net:
+                    node = net.get(node_name)
                     makeTerm(node, title=f'Terminal for {node.name}')
                     print(f"Opened terminal for {node.name}")
 
@@ -357,25 +580,23 @@ def run(num_rings, num_routers, use_cli, use_mnet, stable_monitors,
 
     except Exception as e:
         print(f"Error during execution: {e}")
-        cleanup_network()
         sys.exit(1)
 
-    finally:
-        # If we haven't cleaned up (i.e., not a Ctrl+C but a normal exit), do it here
-        if not cleanup_in_progress:
-            cleanup_network()
-        cleanup_webpack()
-
 
 def usage():
-    print("Usage: python3 -m emulation.mnet.run_mn [--cli] [--no-mnet] [--monitor] <config_file>")
+    print("Usage: python3 -m emulation.mnet.run_mn [--cli] [--no-mnet] [--monitor] [--terms] [--webpack] <config_file>")
 
 
 if __name__ == "__main__":
+    # Dump a traceback if mininet crashes the interpreter
+    faulthandler.enable()
+
     # Process flags
     use_cli = "--cli" in sys.argv
     use_mnet = "--no-mnet" not in sys.argv
     enable_monitoring = "--monitor" in sys.argv
+    use_terms = "--terms" in sys.argv
+    use_webpack = "--webpack" in sys.argv
 
     # Strip flags from argv to locate config file
     args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
@@ -404,6 +625,16 @@ if __name__ == "__main__":
             lat, lon = map(float, coords.split(','))
             ground_station_data[name] = (lat, lon)
 
+    # Vessels use the same config section format as geosimsat
+    vessel_data = {}
+    if 'vessels' in parser:
+        for name, waypoint_str in parser['vessels'].items():
+            waypoints = []
+            for waypoint in waypoint_str.split(';'):
+                lat, lon = map(float, waypoint.split(','))
+                waypoints.append((lat, lon))
+            vessel_data[name] = waypoints
+
     num_rings = parser['network'].getint('rings', 4)
     num_routers = parser['network'].getint('routers', 4)
     ground_stations = parser['network'].getboolean('ground_stations', False)
@@ -415,14 +646,24 @@ if __name__ == "__main__":
 
     setLogLevel("info")
 
-    # Start webpack in watch mode so that frontend changes are automatically built
+    # Start webpack in watch mode so that frontend changes are automatically built.
+    # Otherwise build the bundle once if it has never been built, so no watcher
+    # competes with the routers for CPU.
     webpack_dir = os.path.join("emulation", "mnet", "static", "js")
-    try:
-        webpack_process = subprocess.Popen(["npm", "run", "watch"], cwd=webpack_dir)
-        print("Started webpack watch process in", webpack_dir)
-    except Exception as e:
-        print("Error starting webpack watch process:", e)
-        webpack_process = None
+    bundle_built = os.path.exists(os.path.join(webpack_dir, "dist", "bundle.js"))
+    if use_webpack:
+        try:
+            webpack_process = subprocess.Popen(["npm", "run", "watch"], cwd=webpack_dir)
+            print("Started webpack watch process in", webpack_dir)
+        except Exception as e:
+            print("Error starting webpack watch process:", e)
+            webpack_process = None
+    elif not bundle_built:
+        try:
+            print("Building webpack bundle in", webpack_dir)
+            subprocess.run(["npm", "run", "build"], cwd=webpack_dir, check=False)
+        except Exception as e:
+            print("Error building webpack bundle:", e)
 
     # Print some startup info
     print(f"\nStarting simulation with:")
@@ -440,4 +681,5 @@ if __name__ == "__main__":
 
     # Run the simulation
     run(num_rings, num_routers, use_cli, use_mnet, stable_monitors,
-        ground_stations, enable_monitoring, ground_station_data)
+        ground_stations, enable_monitoring, ground_station_data, use_terms,
+        vessel_data)
@@ -148,12 +148,12 @@ const DatabaseMonitor = () => {
                   <tbody className="bg-white divide-y divide-gray-200">
                     {dbData.data.map((row, i) => (
                       <tr key={i}>
-                        {dbData.columns.map(column => (
+                        {dbData.columns.map((column, j) => (
                           <td 
                             key={column}
                             className="px-6 py-4 whitespace-nowrap text-sm text-gray-900"
                           >
-                            {String(row[column])}
+                            {String(row[j])}
                           </td>
                         ))}
                       </tr>
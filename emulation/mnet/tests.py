@@ -1,9 +1,65 @@
+import importlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
 import unittest
+from unittest import mock
 import mnet.pmonitor
 import frr_config_topo
 import torus_topo
 import mnet.frr_topo
 
+class FakeFrrSocket:
+    """
+    Stands in for the socket to an FRR daemon. Each recv_into returns the
+    next of the given chunks, and an empty read once they run out.
+    """
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.sent = b''
+
+    def connect(self, path):
+        pass
+
+    def sendall(self, data):
+        self.sent += data
+
+    def recv_into(self, buf):
+        if len(self.chunks) == 0:
+            return 0
+        chunk = self.chunks.pop(0)
+        buf[:len(chunk)] = chunk
+        return len(chunk)
+
+    def close(self):
+        pass
+
+
+def baseline_record_sample(db, name, address, stable, result):
+    """
+    How sample_target recorded a result before record_sample used an UPSERT.
+    """
+    prev_responded = False
+    row = db.execute("SELECT responded FROM targets WHERE address = ?", (address,)).fetchone()
+    if row is None:
+        db.execute("INSERT INTO targets (name, address, sample_time, stable) VALUES (?, ?, ?, ?)",
+                   (name, address, 0, stable))
+    else:
+        prev_responded = row[0]
+    if result:
+        db.execute("UPDATE targets SET responded = TRUE, total_count = total_count + 1, "
+                   "total_success = total_success + 1 WHERE address = ?", (address,))
+    elif prev_responded:
+        db.execute("UPDATE targets SET responded = FALSE, total_count = total_count + 1 "
+                   "WHERE address = ?", (address,))
+
+
+def frr_reply(status, output=b''):
+    return output + b'\x00\x00\x00' + bytes([status])
+
+
 class TestCase(unittest.TestCase):
     def testPMonitor(self):
         self.assertTrue(mnet.pmonitor.test())
@@ -34,3 +90,116 @@ class TestCase(unittest.TestCase):
         # set station uplinks
         frrt.stop_routers()
 
+    def frrRouter(self):
+        router = mnet.frr_topo.FrrRouter("R0_0", "10.0.0.1")
+        self.addCleanup(os.unlink, router.working_db)
+        # Any node makes config_frr talk to the daemon rather than run as a stub
+        router.node = object()
+        return router
+
+    def configFrr(self, router, chunks, commands):
+        fake = FakeFrrSocket(chunks)
+        with mock.patch.object(socket, "socket", return_value=fake):
+            result = router.config_frr("ospfd", commands)
+        return result, fake.sent
+
+    def testFrrRepliesSplitFrame(self):
+        router = self.frrRouter()
+        # The NUL bytes of the first frame are split, the second frame's status
+        # arrives in the next read and the third frame is whole.
+        sock = FakeFrrSocket([b'out\x00\x00', b'\x00\x00ok\x00\x00\x00', b'\x01' + frr_reply(0)])
+        self.assertEqual(router._read_frr_replies(sock, 3), [0, 1, 0])
+
+    def testFrrRepliesEarlyClose(self):
+        router = self.frrRouter()
+        sock = FakeFrrSocket([frr_reply(0) + b'\x00\x00\x00'])
+        self.assertEqual(router._read_frr_replies(sock, 3), [0])
+
+    def testConfigFrr(self):
+        router = self.frrRouter()
+        replies = b''.join(frr_reply(0) for _ in range(5))
+        # Deliver the replies a few bytes at a time
+        chunks = [replies[i:i + 3] for i in range(0, len(replies), 3)]
+        result, sent = self.configFrr(router, chunks, ["router ospf"])
+        self.assertTrue(result)
+        self.assertEqual(sent, b'enable\x00conf term file-lock\x00router ospf\x00end\x00disable\x00')
+
+    def testConfigFrrFailedCommand(self):
+        router = self.frrRouter()
+        replies = [frr_reply(0), frr_reply(0), frr_reply(1), frr_reply(0), frr_reply(0), frr_reply(0)]
+        result, sent = self.configFrr(router, replies, ["bad command", "router ospf"])
+        self.assertFalse(result)
+        # Commands after the failed one are still sent
+        self.assertIn(b'router ospf\x00', sent)
+
+    def testConfigFrrLocked(self):
+        router = self.frrRouter()
+        # conf term fails when another client holds the config lock
+        replies = [frr_reply(0), frr_reply(1, b'% Configuration is locked'), frr_reply(0), frr_reply(0)]
+        result, sent = self.configFrr(router, replies, ["router ospf"])
+        self.assertFalse(result)
+        self.assertEqual(sent, b'enable\x00conf term file-lock\x00end\x00disable\x00')
+
+    def testConfigFrrEarlyClose(self):
+        router = self.frrRouter()
+        result, sent = self.configFrr(router, [frr_reply(0), frr_reply(0), frr_reply(0)],
+                                      ["router ospf", "network 10.0.0.0/8 area 0"])
+        self.assertFalse(result)
+
+    def testFpingSummary(self):
+        # Recorded fping -q -c1 output, addresses are padded to the longest one
+        output = (
+            "10.0.0.1    : xmt/rcv/%loss = 1/1/0%, min/avg/max = 0.05/0.05/0.05\n"
+            "10.0.0.22   : xmt/rcv/%loss = 1/0/100%\n"
+            "10.0.100.33 : xmt/rcv/%loss = 1/1/0%, min/avg/max = 1.20/1.20/1.20\n"
+        )
+        addresses = ["10.0.0.1", "10.0.0.22", "10.0.100.33", "10.0.0.4"]
+        results = mnet.pmonitor.parse_fping_summary(output, addresses)
+        self.assertEqual(results, {
+            "10.0.0.1": True,
+            "10.0.0.22": False,
+            "10.0.100.33": True,
+            # Missing from the output
+            "10.0.0.4": False,
+        })
+
+    def testRecordSample(self):
+        # Counting starts once a target has responded, and failures are only
+        # counted right after a response
+        samples = [False, True, False, False, True, True, False]
+        counts = {}
+        with tempfile.TemporaryDirectory() as db_dir:
+            for record in (baseline_record_sample, mnet.pmonitor.record_sample):
+                db_file = os.path.join(db_dir, f"{record.__name__}.sqlite")
+                mnet.pmonitor.create_db(db_file)
+                db = mnet.pmonitor.open_db(db_file)
+                counts[record] = []
+                for result in samples:
+                    record(db, "R0_1", "10.0.0.2", True, result)
+                    counts[record].append(db.execute(
+                        "SELECT responded, total_count, total_success FROM targets").fetchall())
+                db.close()
+        self.assertEqual(counts[mnet.pmonitor.record_sample], counts[baseline_record_sample])
+
+    def testCleanupFrrState(self):
+        # run_mn mounts the web files relative to the repository root
+        cwd = os.getcwd()
+        os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+        self.addCleanup(os.chdir, cwd)
+        run_mn = importlib.import_module("emulation.mnet.run_mn")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # A harmless pattern and a process it matches, in place of the FRR daemons
+            pattern = f"cleanup-test-{os.getpid()}"
+            daemon = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)", pattern])
+            # The script's text holds the pattern, so pkill must not run from it
+            marker = os.path.join(tmp_dir, "script-ran")
+            script = f"touch {marker} # {pattern}"
+            os.mkdir(os.path.join(tmp_dir, "frr.dir"))
+            open(os.path.join(tmp_dir, "frr.file"), "w").close()
+
+            run_mn.cleanup_frr_state(pattern, script, [os.path.join(tmp_dir, "frr.*")])
+
+            self.assertEqual(daemon.wait(timeout=5), -15)
+            self.assertTrue(os.path.exists(marker))
+            self.assertEqual(sorted(os.listdir(tmp_dir)), ["script-ran"])
@@ -1,25 +1,51 @@
 '''
 Client to drive the JSON api implemented in driver.py
 '''
+import logging
+
 import requests
 from emulation import simapi
 
+logger = logging.getLogger(__name__)
+
 class Client:
+    # Header for payloads that are already serialized to JSON
+    JSON_HEADERS = {"Content-Type": "application/json"}
+
     def __init__(self, url: str) -> None:
         self.url = url
+        # Reuse one keep-alive connection for all calls
+        self.session = requests.Session()
 
     def set_link_state(self, node1: str, node2: str, up: bool) -> None:
         try:
-            print(f"send link state {node1}, {node2}, state up {up}")
+            logger.debug("send link state %s, %s, state up %s", node1, node2, up)
             data = simapi.Link(node1_name=node1, node2_name=node2, up="true" if up else "false")
             url = f"{self.url}/link"
-            r = requests.put(url, 
+            r = self.session.put(url, 
                     json=data.model_dump())
-            print(r.text)
+            logger.debug("%s", r.text)
         except requests.exceptions.ConnectionError as e:
-            print(e)
+            logger.warning("%s", e)
             pass
 
+    def set_link_states(self, changes: list[tuple[str, str, bool]]) -> None:
+        '''
+        Send several link state changes to the server in one request
+
+        Args:
+            changes: List of tuples containing (node1, node2, up), applied in order
+        '''
+        try:
+            logger.debug("send %d link states", len(changes))
+            data = [simapi.Link(node1_name=node1, node2_name=node2, up=up).model_dump()
+                    for node1, node2, up in changes]
+            url = f"{self.url}/links"
+            r = self.session.put(url, json=data)
+            logger.debug("%s", r.text)
+        except requests.exceptions.ConnectionError as e:
+            logger.warning("%s", e)
+
     def set_uplinks(self, ground_node: str, links: list[tuple[str, int, float]]) -> None:
         '''
         Send uplink updates to the server
@@ -29,7 +55,7 @@ class Client:
             links: List of tuples containing (satellite_name, distance, delay)
         '''
         try:
-            print(f"send up links: {ground_node}")
+            logger.debug("send up links: %s", ground_node)
             data = simapi.UpLinks(ground_node=ground_node, uplinks=[])
             for link in links:
                 data.uplinks.append(simapi.UpLink(
@@ -38,17 +64,18 @@ class Client:
                     delay=link[2]
                 ))
             url = f"{self.url}/uplinks"
-            print(data.model_dump())
-            r = requests.put(url, json=data.model_dump())
-            print(r.text)
+            r = self.session.put(url, json=data.model_dump())
+            logger.debug("%s", r.text)
         except requests.exceptions.ConnectionError as e:
-            print(e)
+            logger.warning("%s", e)
 
     def update_positions(self, positions: simapi.GraphData) -> None:
         try:
-            print("Sending satellite and ground station positions update")
+            logger.debug("Sending satellite and ground station positions update")
             url = f"{self.url}/positions"
-            r = requests.put(url, json=positions.model_dump())
-            print(r.text)
+            # Serialize straight to JSON bytes rather than building a dict first
+            r = self.session.put(url, data=positions.model_dump_json(),
+                                 headers=Client.JSON_HEADERS)
+            logger.debug("%s", r.text)
         except requests.exceptions.ConnectionError as e:
-            print(e)
\ No newline at end of file
+            logger.warning("%s", e)
\ No newline at end of file
@@ -1,9 +1,29 @@
+import datetime
 import unittest
+import numpy as np
+from skyfield.api import wgs84
 import torus_topo
+import geosimsat
 import frr_config_topo
 import sat_pos_samples
 import gps_sats
 
+def baseline_down_inter_ring_links(graph, node_num_list, num_rings):
+    """
+    How down_inter_ring_links found the links, by checking every neighbor.
+    """
+    for node_num in node_num_list:
+        for ring_num in range(num_rings):
+            node_name = torus_topo.get_node_name(ring_num, node_num)
+            for neighbor_name in graph.adj[node_name]:
+                if graph[node_name][neighbor_name]["inter_ring"]:
+                    graph[node_name][neighbor_name]["up"] = False
+
+
+def down_links(graph):
+    return set(frozenset(edge) for edge in graph.edges if not graph.edges[edge]["up"])
+
+
 class TestCase(unittest.TestCase):
     def testTorus(self):
         self.assertTrue(torus_topo.run_small_test())
@@ -24,3 +44,97 @@ class TestCase(unittest.TestCase):
 
     def testGpsSats(self):
         gps_sats.load_gps_sats()
+
+    def geoSimulation(self):
+        graph = torus_topo.create_network(4, 6, ground_station_data={"G_LON": (51.5, -0.1)})
+        sim = geosimsat.SatSimulation(graph)
+        sim.propagateSatellites(datetime.datetime(2025, 3, 1, 12, 30, tzinfo=datetime.timezone.utc))
+        return sim
+
+    def testSatellitePositions(self):
+        # The vectorized propagation must match skyfield's per satellite positions
+        sim = self.geoSimulation()
+        t = sim.sfield_time
+        for i, satellite in enumerate(sim.satellites):
+            position = wgs84.geographic_position_of(satellite.earth_sat.at(t))
+            self.assertAlmostEqual(sim.sat_lat_deg[i], position.latitude.degrees, delta=1e-6)
+            lon_diff = (sim.sat_lon_deg[i] - position.longitude.degrees + 180) % 360 - 180
+            self.assertAlmostEqual(lon_diff, 0, delta=1e-6)
+            self.assertAlmostEqual(sim.sat_height_km[i], position.elevation.km, delta=1e-6)
+
+    def testElevation(self):
+        # The elevation used for uplinks must match skyfield's altaz
+        sim = self.geoSimulation()
+        t = sim.sfield_time
+        station = sim.ground_stations[0]
+        difference = sim.sat_itrf_km - sim.station_xyz_km[0]
+        sin_elevation = difference.dot(sim.station_up[0]) / np.linalg.norm(difference, axis=1)
+        for i, satellite in enumerate(sim.satellites):
+            alt, _, _ = (satellite.earth_sat - station.position).at(t).altaz()
+            self.assertAlmostEqual(np.degrees(np.arcsin(sin_elevation[i])), alt.degrees, delta=1e-4)
+
+    def testAdvanceVessels(self):
+        # One vessel moves between two waypoints, the other has one and stays put
+        lat = np.array([0.0, 5.0])
+        lon = np.array([0.0, 5.0])
+        waypoints_lat = np.array([[0.0, 0.0], [5.0, 0.0]])
+        waypoints_lon = np.array([[0.0, 3.0], [5.0, 0.0]])
+        num_waypoints = np.array([2, 1])
+        current_index = np.array([0, 0])
+        next_index = np.array([1, 1])
+        moving_forward = np.array([True, True])
+        speed = np.array([1.0, 1.0])
+
+        lons = []
+        for _ in range(6):
+            lat, lon, current_index, next_index, moving_forward = geosimsat.advance_vessels(
+                lat, lon, waypoints_lat, waypoints_lon, num_waypoints,
+                current_index, next_index, moving_forward, speed)
+            lons.append(lon[0])
+            self.assertEqual((lat[1], lon[1]), (5.0, 5.0))
+        # Turns back at the last waypoint and again at the first
+        self.assertEqual(lons, [1.0, 2.0, 3.0, 2.0, 1.0, 0.0])
+        self.assertTrue(moving_forward[0])
+        self.assertEqual((current_index[0], next_index[0]), (0, 1))
+
+    def testNearbySatellites(self):
+        sim = self.geoSimulation()
+        count = len(sim.satellites)
+        sim.sat_lat_deg = np.full(count, 80.0)
+        sim.sat_lon_deg = np.zeros(count)
+        # Near in latitude and across the antimeridian
+        sim.sat_lat_deg[0], sim.sat_lon_deg[0] = 10.0, 179.0
+        sim.sat_lat_deg[1], sim.sat_lon_deg[1] = 0.0, -170.0
+        # Near in longitude only
+        sim.sat_lat_deg[2], sim.sat_lon_deg[2] = 40.0, -175.0
+        # Near in latitude only
+        sim.sat_lat_deg[3], sim.sat_lon_deg[3] = 5.0, 150.0
+        sim.indexSatellites()
+        self.assertEqual(sim.nearbySatellites(5.0, -179.0).tolist(), [0, 1])
+        self.assertEqual(sim.nearbySatellites(5.0, 179.0).tolist(), [0, 1])
+
+    def testDownInterRingLinks(self):
+        # Rings in the graph and rings to down the links of
+        for graph_rings, num_rings in ((1, 1), (2, 2), (5, 5), (5, 3)):
+            graph = torus_topo.create_network(graph_rings, 6)
+            torus_topo.down_inter_ring_links(graph, [0, 2, 3], num_rings)
+            baseline = torus_topo.create_network(graph_rings, 6)
+            baseline_down_inter_ring_links(baseline, [0, 2, 3], num_rings)
+            self.assertEqual(down_links(graph), down_links(baseline))
+            self.assertTrue(len(down_links(graph)) > 0)
+
+    def testNodesByType(self):
+        graph = torus_topo.create_network(2, 3)
+        self.assertEqual(len(torus_topo.satellites(graph)), 6)
+        self.assertEqual(torus_topo.ground_stations(graph), [])
+        # Adding stations to a built graph replaces the cached lists
+        torus_topo.add_ground_stations(graph, {"G_LON": (51.5, -0.1)})
+        self.assertEqual(torus_topo.ground_stations(graph), ["G_LON"])
+        # Graphs built by hand are scanned on every call
+        graph = frr_config_topo.gen_test_graph()
+        graph.remove_node("R4")
+        graph.add_node("G1", type=torus_topo.TYPE_GROUND)
+        graph.nodes["R3"][torus_topo.TYPE] = torus_topo.TYPE_VESSEL
+        self.assertEqual(torus_topo.satellites(graph), ["R1", "R2"])
+        self.assertEqual(torus_topo.ground_stations(graph), ["G1"])
+        self.assertEqual(torus_topo.vessels(graph), ["R3"])
@@ -5,6 +5,8 @@ This is a series of connected rings.
 Include test code to generate route maps and test connectivity.
 '''
 
+import collections
+import concurrent.futures
 from dataclasses import dataclass
 from typing import ClassVar
 import networkx
@@ -65,9 +67,8 @@ def create_network(
     if vessel_data:
         add_vessels(graph, vessel_data)
 
-    # Set all edges to up
-    for edge_name, edge in graph.edges.items():
-        edge["up"] = True
+    index_nodes_by_type(graph)
+    # All edges are created up
     return graph
 
 def add_vessels(graph: networkx.Graph, vessel_data: dict) -> None:
@@ -75,61 +76,73 @@ def add_vessels(graph: networkx.Graph, vessel_data: dict) -> None:
     Add vessels to the graph using the provided vessel data.
     Creates dummy links between vessels for Mininet configuration purposes.
     '''
+    # The node lists change
+    graph.graph.pop("nodes_by_type", None)
+    nodes = []
     for name, waypoints in vessel_data.items():
-        graph.add_node(name)
-        node = graph.nodes[name]
-        node[TYPE] = TYPE_VESSEL
+        node = {TYPE: TYPE_VESSEL}
         # Set initial position as first waypoint
         if waypoints:
             node[LAT] = waypoints[0][0]
             node[LON] = waypoints[0][1]
         # Store waypoints for movement
         node["waypoints"] = waypoints
+        nodes.append((name, node))
+    graph.add_nodes_from(nodes)
 
     # Create edges between vessels (like ground stations)
     vessel_names = list(vessel_data.keys())
-    for i in range(len(vessel_names) - 1):
-        graph.add_edge(vessel_names[i], vessel_names[i + 1])
+    graph.add_edges_from(zip(vessel_names, vessel_names[1:]), up=True)
 
 
+def nodes_by_type(graph: networkx.Graph) -> dict[str, list[str]]:
+    '''
+    Return the node names of each node type, found in a single pass over the nodes.
+    Uses the lists cached by index_nodes_by_type when the graph has them.
+    '''
+    cached = graph.graph.get("nodes_by_type")
+    if cached is not None:
+        return cached
+    result: dict[str, list[str]] = {TYPE_SAT: [], TYPE_GROUND: [], TYPE_VESSEL: []}
+    for name, node_type in graph.nodes(data=TYPE):
+        result.setdefault(node_type, []).append(name)
+    return result
+
+def index_nodes_by_type(graph: networkx.Graph) -> None:
+    '''
+    Cache the node names of each type on a complete graph. Anything that later
+    adds or removes nodes, or changes a node's type, must remove the cache.
+    '''
+    graph.graph.pop("nodes_by_type", None)
+    graph.graph["nodes_by_type"] = nodes_by_type(graph)
+
 def ground_stations(graph: networkx.Graph) -> list[str]:
     '''
     Return a list of all node names where the node is of type ground
     '''
-    # Consider converting to using yield
-    result = []
-    for name in graph.nodes:
-        if graph.nodes[name][TYPE] == TYPE_GROUND:
-            result.append(name)
-    return result
+    return list(nodes_by_type(graph)[TYPE_GROUND])
 
 def vessels(graph: networkx.Graph) -> list[str]:
     '''
     Return a list of all node names where the node is of type vessel
     '''
-    result = []
-    for name in graph.nodes:
-        if graph.nodes[name][TYPE] == TYPE_VESSEL:
-            result.append(name)
-    return result
+    return list(nodes_by_type(graph)[TYPE_VESSEL])
 
 def satellites(graph: networkx.Graph) -> list[str]:
     '''
     Return a list of all node names where the node is of type satellite
     '''
-    # Consider converting to using yield
-    result = []
-    for name in graph.nodes:
-        if graph.nodes[name][TYPE] == TYPE_SAT:
-            result.append(name)
-    return result
+    return list(nodes_by_type(graph)[TYPE_SAT])
 
 # Format for generating TLE oribit information
 # Use canned IU, mean motion derivitivs, and drag term data
 LINE1 = "1 {:05d}U 24067A   {:2d}{:012.8f}  .00009878  00000-0  47637-3 0  999"
-# Use a perigee of 297 (could just be 0). Canned data for orbit count, prbits per day,
-# and exccentricity
-LINE2 = "2 {:05d} {:8.4f} {:8.4f} 0000000 000.0000 {:8.4f} 15.33600000 6847"
+# Canned data for orbit count. Eccentricity is zero and perigee undefined for a
+# circular orbit, the mean motion is calculated from the altitude.
+LINE2 = "2 {:05d} {:8.4f} {:8.4f} 0000000 000.0000 {:8.4f} {:11.8f} 6847"
+# Checksum contribution of each byte of a TLE line: digits count their value,
+# a minus sign counts one and everything else counts zero
+TLE_CHECK_SUM_TABLE = bytes(i - 48 if 48 <= i <= 57 else 1 if i == 45 else 0 for i in range(256))
 
 
 @dataclass
@@ -143,42 +156,44 @@ class OrbitData:
     altitude: float  # kilometers
     cat_num: int = 0
 
-    cat_num_count: ClassVar[int] = 1
+    # Mean motion for each altitude, the constellation shares a single altitude
+    mean_motion_cache: ClassVar[dict[float, float]] = {}
 
     def calculate_mean_motion(self) -> float:
         """Calculate mean motion from altitude assuming circular orbit"""
-        # Calculate semi-major axis (radius from Earth's center)
-        semi_major_axis = EARTH_RADIUS + self.altitude
-        # Calculate mean motion in revolutions per day
-        # n = sqrt(μ/a³) * (86400/2π) for rev/day
-        mean_motion = sqrt(MU / (semi_major_axis ** 3)) * (86400 / (2 * pi))
+        mean_motion = OrbitData.mean_motion_cache.get(self.altitude)
+        if mean_motion is None:
+            # Calculate semi-major axis (radius from Earth's center)
+            semi_major_axis = EARTH_RADIUS + self.altitude
+            # Calculate mean motion in revolutions per day
+            # n = sqrt(μ/a³) * (86400/2π) for rev/day
+            mean_motion = sqrt(MU / (semi_major_axis ** 3)) * (86400 / (2 * pi))
+            OrbitData.mean_motion_cache[self.altitude] = mean_motion
         return mean_motion
 
-    def assign_cat_num(self) -> None:
-        self.cat_num = OrbitData.cat_num_count
-        OrbitData.cat_num_count += 1
-
     @staticmethod
     def tle_check_sum(line: str) -> str:
-        val = 0
-        for i in range(len(line)):
-            if line[i] == "-":
-                val += 1
-            elif line[i].isdigit():
-                val += int(line[i])
-        return str(val % 10)
-
-    def tle_format(self) -> tuple[str,str]:
+        return str(sum(line.encode('ascii').translate(TLE_CHECK_SUM_TABLE)) % 10)
+
+    @staticmethod
+    def current_epoch() -> tuple[int, int]:
+        '''
+        Return the two digit year and day of the year used as the TLE epoch.
+        '''
         time_tuple = datetime.datetime.now().timetuple()
-        year = time_tuple.tm_year % 1000 % 100
-        day = time_tuple.tm_yday
-        
+        return time_tuple.tm_year % 100, time_tuple.tm_yday
+
+    def tle_format(self, epoch: tuple[int, int] | None = None) -> tuple[str,str]:
+        '''
+        Return the two TLE lines for the orbit. Pass the epoch from current_epoch
+        when formatting many orbits, otherwise the current time is used.
+        '''
+        year, day = epoch if epoch is not None else OrbitData.current_epoch()
+
         mean_motion = self.calculate_mean_motion()
         
         l1 = LINE1.format(self.cat_num, year, day, 342)
-        # Modified to use calculated mean motion instead of hardcoded value 
-        # (changed eccentricity to zero and perigee undefined due to circular orbit)
-        l2 = "2 {:05d} {:8.4f} {:8.4f} 0000000 000.0000 {:8.4f} {:11.8f} 6847".format(
+        l2 = LINE2.format(
             self.cat_num, 
             self.inclination, 
             self.right_ascension, 
@@ -195,8 +210,7 @@ def get_node_name(ring_num: int, node_num: int) -> str:
 
 
 def create_ring(graph: networkx.Graph, ring_num: int, num_ring_nodes: int) -> None:
-    prev_node_name: str | None = None
-    ring_nodes: list[str] = []
+    ring_nodes: list[str] = [get_node_name(ring_num, node_num) for node_num in range(num_ring_nodes)]
     graph.graph["ring_list"].append(ring_nodes)
 
     # Set parameters for this orbit
@@ -205,39 +219,29 @@ def create_ring(graph: networkx.Graph, ring_num: int, num_ring_nodes: int) -> No
     inclination: float = graph.graph["inclination"]
     altitude: float = graph.graph["altitude"]
 
-    for node_num in range(num_ring_nodes):
-        # Create a node in the ring
-        node_name = get_node_name(ring_num, node_num)
-        graph.add_node(node_name)
-        graph.nodes[node_name][TYPE] = TYPE_SAT
+    # Create the nodes in the ring
+    nodes = []
+    for node_num, node_name in enumerate(ring_nodes):
         mean_anomaly = 360 / num_ring_nodes * node_num
         # Offset 1/2 spacing for odd rings
         if ring_num % 2 == 1:
             mean_anomaly += 360 / num_ring_nodes / 2
-        orbit = OrbitData(right_ascension, inclination, mean_anomaly, altitude)
-        orbit.assign_cat_num()
-        graph.nodes[node_name]["orbit"] = orbit
-        graph.nodes[node_name]["altitude"] = altitude  # Add altitude to the node metadata
-        ring_nodes.append(node_name)
-
-        # Create a link to the previously created node
-        if prev_node_name is not None:
-            graph.add_edge(prev_node_name, node_name)
-            graph.edges[prev_node_name, node_name]["inter_ring"] = False
-        prev_node_name = node_name
-    # Create a link between first and last node
-    if prev_node_name is not None:
-        graph.add_edge(prev_node_name, get_node_name(ring_num, 0))
-        graph.edges[prev_node_name, get_node_name(ring_num, 0)]["inter_ring"] = False
+        # Catalog numbers count the satellites of the graph from 1 in ring order
+        cat_num = ring_num * num_ring_nodes + node_num + 1
+        orbit = OrbitData(right_ascension, inclination, mean_anomaly, altitude, cat_num)
+        nodes.append((node_name, {TYPE: TYPE_SAT, "orbit": orbit, "altitude": altitude}))
+    graph.add_nodes_from(nodes)
 
+    # Link each node to the next, and the last node back to the first
+    graph.add_edges_from(
+        (ring_nodes[i], ring_nodes[(i + 1) % num_ring_nodes], {"inter_ring": False, "up": True})
+        for i in range(num_ring_nodes))
 
 
 def connect_rings(graph: networkx.Graph, ring1: int, ring2: int, num_ring_nodes: int) -> None:
-    for node_num in range(num_ring_nodes):
-        node1_name = get_node_name(ring1, node_num)
-        node2_name = get_node_name(ring2, node_num)
-        graph.add_edge(node1_name, node2_name)
-        graph.edges[node1_name, node2_name]["inter_ring"] = True
+    graph.add_edges_from(
+        (get_node_name(ring1, node_num), get_node_name(ring2, node_num), {"inter_ring": True, "up": True})
+        for node_num in range(num_ring_nodes))
 
 
 def add_ground_stations(graph: networkx.Graph, ground_station_data: dict) -> None:
@@ -248,17 +252,15 @@ def add_ground_stations(graph: networkx.Graph, ground_station_data: dict) -> Non
         graph: The networkx graph to update.
         ground_station_data: Dictionary with ground station names as keys and (lat, lon) tuples as values.
     '''
-    for name, (lat, lon) in ground_station_data.items():
-        graph.add_node(name)
-        node = graph.nodes[name]
-        node[TYPE] = TYPE_GROUND
-        node[LAT] = lat
-        node[LON] = lon
+    # The node lists change
+    graph.graph.pop("nodes_by_type", None)
+    graph.add_nodes_from(
+        (name, {TYPE: TYPE_GROUND, LAT: lat, LON: lon})
+        for name, (lat, lon) in ground_station_data.items())
 
     # Optionally, create edges between ground stations
     ground_station_names = list(ground_station_data.keys())
-    for i in range(len(ground_station_names) - 1):
-        graph.add_edge(ground_station_names[i], ground_station_names[i + 1])
+    graph.add_edges_from(zip(ground_station_names, ground_station_names[1:]), up=True)
 
 
 
@@ -272,13 +274,14 @@ def down_inter_ring_links(graph: networkx.Graph, node_num_list: list[int], num_r
     to prevent use during a path trace. This causes many inter-ring links to be down to 
     test the routing functions.
     '''
-    # Set the specified links to down
+    # Set the specified links to down. The inter-ring links of a node go to the
+    # same node number in the rings on either side.
+    graph_rings: int = graph.graph["rings"]
     for node_num in node_num_list:
         for ring_num in range(num_rings):
             node_name = get_node_name(ring_num, node_num)
-            for neighbor_name in graph.adj[node_name]:
-                if graph[node_name][neighbor_name]["inter_ring"]:
-                    graph[node_name][neighbor_name]["up"] = False
+            for neighbor_ring in ((ring_num - 1) % graph_rings, (ring_num + 1) % graph_rings):
+                graph.edges[node_name, get_node_name(neighbor_ring, node_num)]["up"] = False
 
 
 def generate_route_table(graph: networkx.Graph, node_name: str) -> dict[str,tuple[int,str]]:
@@ -290,22 +293,20 @@ def generate_route_table(graph: networkx.Graph, node_name: str) -> dict[str,tupl
     '''
 
     routes = {}  # Dest: (hops, next hop node)
-    for name, node in graph.nodes.items():
-        node["visited"] = False
 
     # Queue to nodes to visit
-    node_list = []
-    # Mark the start node as visited
-    graph.nodes[node_name]["visited"] = True
+    node_list: collections.deque[tuple[int, str, str]] = collections.deque()
+    # Mark the start node as visited. Kept locally so the graph is not modified.
+    visited: set[str] = {node_name}
 
     def visit_node(graph: networkx.Graph, next_hop: str, path_len: int, visit_node_name: str) -> None:
         '''
         Visit a node by adding all neighbors to the visit queue
         '''
         # Neighbors already visted are added to the queue, we skip them here
-        if graph.nodes[visit_node_name]["visited"]:
+        if visit_node_name in visited:
             return
-        graph.nodes[visit_node_name]["visited"] = True
+        visited.add(visit_node_name)
 
         # This node is reachable from the start node via the given 
         # next hop from the start node
@@ -323,32 +324,60 @@ def generate_route_table(graph: networkx.Graph, node_name: str) -> dict[str,tupl
 
     # Visit all nodes until the queue is empty
     while len(node_list) > 0:
-        path_len, next_hop, visit_node_name = node_list.pop(0)
+        path_len, next_hop, visit_node_name = node_list.popleft()
         visit_node(graph, next_hop, path_len, visit_node_name)
 
     return routes
 
 
+# Graph used by the route table worker processes, set by init_route_worker
+route_worker_graph: networkx.Graph | None = None
+
+
+def init_route_worker(graph: networkx.Graph) -> None:
+    global route_worker_graph
+    route_worker_graph = graph
+
+
+def route_worker(node_name: str) -> dict[str,tuple[int,str]]:
+    return generate_route_table(route_worker_graph, node_name)
+
+
+def generate_route_tables(graph: networkx.Graph) -> dict[str,dict[str,tuple[int,str]]]:
+    '''
+    Generate the routing tables of all nodes. The searches are independent, so
+    they are spread over worker processes that each receive the graph once.
+    '''
+    node_names = list(graph.nodes())
+    with concurrent.futures.ProcessPoolExecutor(initializer=init_route_worker,
+                                                initargs=(graph,)) as executor:
+        return dict(zip(node_names, executor.map(route_worker, node_names, chunksize=32)))
+
+
 def trace_path(start_node_name: str, target_node_name: str, route_tables: dict[str,dict[str,tuple[int,str]]]) -> bool:
     '''
     Follow the routing tables to trace a path between the start and target node
     route_tables is a dictionary of routes for each source node
     '''
-    unreachable_count: int = 0
     print("trace node %s to %s" % (start_node_name, target_node_name))
-    current_node_name: str | None = start_node_name
+    path: list[str] = []
+    current_node_name: str = start_node_name
 
     # Follow path until we reach the target or it is unreachable
-    while current_node_name is not None and current_node_name != target_node_name:
-        if route_tables[current_node_name].get(target_node_name) is None:
-            current_node_name = None
-            print("unreachable")
-        else:
-            entry = route_tables[current_node_name][target_node_name]
-            next_hop_name = entry[1]
-            print(next_hop_name)
-            current_node_name = next_hop_name
-    return current_node_name is not None
+    reachable = True
+    while current_node_name != target_node_name:
+        entry = route_tables[current_node_name].get(target_node_name)
+        if entry is None:
+            path.append("unreachable")
+            reachable = False
+            break
+        current_node_name = entry[1]
+        path.append(current_node_name)
+
+    # Print the hops together once the path is known
+    if len(path) > 0:
+        print("\n".join(path))
+    return reachable
 
 
 def run_small_test() -> bool:
@@ -384,11 +413,10 @@ def run_routing_test() -> bool:
     for node, entry in routes.items():
         print("node: %s, next: %s, len: %d" % (node, entry[1][0], entry[0]))
 
-    route_tables = {}
-    for node_name in graph.nodes():
+    route_tables = generate_route_tables(graph)
+    for node_name, route_table in route_tables.items():
         print("generate routes %s" % node_name)
-        route_tables[node_name] = generate_route_table(graph, node_name)
-        print(f"len: {len(route_tables[node_name])}")
+        print(f"len: {len(route_table)}")
 
     result: bool = trace_path(get_node_name(0, 0), get_node_name(0, 1), route_tables)
     print()
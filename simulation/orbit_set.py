@@ -270,10 +270,11 @@ class World(DirectObject):
         graph = torus_topo.create_network()
         result = []
 
+        ts = load.timescale()
+        epoch = torus_topo.OrbitData.current_epoch()
         for name in torus_topo.satellites(graph):
             orbit = graph.nodes[name]["orbit"]
-            ts = load.timescale()
-            l1, l2 = orbit.tle_format()
+            l1, l2 = orbit.tle_format(epoch)
             satellite = EarthSatellite(l1, l2, name, ts)
             result.append(satellite)
         return result